@@ -1 +1,5 @@
-# Empty file to make app a Python package
\ No newline at end of file
+# Settings are read from the environment when modules are imported, so the
+# .env file is loaded once, before any of them
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,206 @@
+import math
+from typing import Optional
+from sqlalchemy import func, case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Recipe, Rating, Comment, CommentVote
+from app.ranking import wilson_lower_bound, hot_score
+
+def rating_bucket(value: float) -> int:
+    """Star bucket (1-5) a rating value is counted under; 5.0 belongs to 5."""
+    return max(1, min(int(value), 5))
+
+def _bucket_column(bucket: int):
+    return getattr(Recipe, f"rating_{bucket}_count")
+
+async def apply_rating_change(
+    db: AsyncSession,
+    recipe_id: int,
+    old_value: Optional[float] = None,
+    new_value: Optional[float] = None
+):
+    """
+    Shift the denormalized rating aggregates on a recipe.
+
+    Pass only new_value for an insert, only old_value for a delete and both
+    for an update. The change is issued as a single relative UPDATE so
+    concurrent writers never overwrite each other's increments; it commits
+    together with the rating row itself.
+    """
+    deltas = {}
+    if old_value is not None:
+        deltas[Recipe.rating_sum] = -old_value
+        deltas[Recipe.rating_count] = -1
+        column = _bucket_column(rating_bucket(old_value))
+        deltas[column] = deltas.get(column, 0) - 1
+    if new_value is not None:
+        deltas[Recipe.rating_sum] = deltas.get(Recipe.rating_sum, 0) + new_value
+        deltas[Recipe.rating_count] = deltas.get(Recipe.rating_count, 0) + 1
+        column = _bucket_column(rating_bucket(new_value))
+        deltas[column] = deltas.get(column, 0) + 1
+
+    values = {column: column + delta for column, delta in deltas.items() if delta}
+    if values:
+        # Ratings are not edits to the recipe; keep updated_at untouched
+        values[Recipe.updated_at] = Recipe.updated_at
+        values[Recipe.ratings_updated_at] = func.now()
+        await db.execute(
+            update(Recipe).where(Recipe.id == recipe_id).values(values),
+            execution_options={"synchronize_session": False}
+        )
+
+def rating_bucket_expression():
+    """SQL equivalent of rating_bucket()."""
+    return case(
+        (Rating.rating >= 5, 5),
+        (Rating.rating >= 4, 4),
+        (Rating.rating >= 3, 3),
+        (Rating.rating >= 2, 2),
+        else_=1
+    )
+
+def reconcile_rating_aggregates(db: Session) -> int:
+    """
+    Recompute every recipe's rating aggregates from the ratings table.
+
+    Used to backfill the columns on an existing database and to repair any
+    drift. Returns the number of recipes whose stored values changed.
+    """
+    bucket = rating_bucket_expression()
+    rows = db.query(
+        Rating.recipe_id,
+        func.coalesce(func.sum(Rating.rating), 0.0),
+        func.count(Rating.id),
+        *[func.sum(case((bucket == i, 1), else_=0)) for i in range(1, 6)]
+    ).group_by(Rating.recipe_id).all()
+    actual = {
+        row[0]: {
+            "rating_sum": float(row[1]),
+            "rating_count": row[2],
+            **{f"rating_{i}_count": row[2 + i] for i in range(1, 6)}
+        }
+        for row in rows
+    }
+    empty = {
+        "rating_sum": 0.0,
+        "rating_count": 0,
+        **{f"rating_{i}_count": 0 for i in range(1, 6)}
+    }
+
+    stored = db.query(
+        Recipe.id,
+        Recipe.rating_sum,
+        Recipe.rating_count,
+        *[_bucket_column(i) for i in range(1, 6)]
+    ).all()
+    mappings = []
+    for row in stored:
+        expected = actual.get(row[0], empty)
+        counts = {
+            "rating_count": row[2],
+            **{f"rating_{i}_count": row[2 + i] for i in range(1, 6)}
+        }
+        # The stored sum was built up in a different order than SUM() adds,
+        # so the two can differ in the last bits without any drift
+        sum_matches = row[1] is not None and math.isclose(
+            row[1], expected["rating_sum"], rel_tol=1e-12, abs_tol=1e-9
+        )
+        if not sum_matches or any(counts[key] != expected[key] for key in counts):
+            mappings.append({"id": row[0], **expected})
+
+    if mappings:
+        db.bulk_update_mappings(Recipe, mappings)
+    db.commit()
+    return len(mappings)
+
+async def touch_comment_thread(db: AsyncSession, recipe_id):
+    """Record that a recipe's comment thread changed (see app/conditional.py)."""
+    await db.execute(
+        update(Recipe).where(Recipe.id == recipe_id).values({
+            Recipe.comments_version: Recipe.comments_version + 1,
+            Recipe.comments_updated_at: func.now(),
+            Recipe.updated_at: Recipe.updated_at,
+        }),
+        execution_options={"synchronize_session": False}
+    )
+
+VOTE_COLUMNS = {"up": Comment.upvotes, "down": Comment.downvotes}
+
+async def apply_vote_change(
+    db: AsyncSession,
+    comment_id: int,
+    old_type: Optional[str] = None,
+    new_type: Optional[str] = None
+):
+    """Shift a comment's vote tallies; same conventions as apply_rating_change."""
+    if old_type == new_type:
+        return
+    values = {}
+    if old_type in VOTE_COLUMNS:
+        column = VOTE_COLUMNS[old_type]
+        values[column] = column - 1
+    if new_type in VOTE_COLUMNS:
+        column = VOTE_COLUMNS[new_type]
+        values[column] = column + 1
+    if values:
+        # Votes are not edits to the comment; keep updated_at untouched
+        values[Comment.updated_at] = Comment.updated_at
+        result = await db.execute(
+            update(Comment).where(Comment.id == comment_id).values(values)
+            .returning(Comment.upvotes, Comment.downvotes, Comment.created_at),
+            execution_options={"synchronize_session": False}
+        )
+        row = result.first()
+        if row is not None:
+            # The row stays locked until commit, so the scores match the
+            # tallies just written
+            await db.execute(
+                update(Comment).where(Comment.id == comment_id).values({
+                    Comment.best_score: wilson_lower_bound(row.upvotes, row.downvotes),
+                    Comment.hot_score: hot_score(row.upvotes, row.downvotes, row.created_at),
+                    Comment.updated_at: Comment.updated_at,
+                }),
+                execution_options={"synchronize_session": False}
+            )
+        await touch_comment_thread(
+            db, select(Comment.recipe_id).where(Comment.id == comment_id).scalar_subquery()
+        )
+
+def reconcile_vote_counts(db: Session) -> int:
+    """
+    Recompute every comment's vote tallies, and the ranking scores derived
+    from them, from the comment_votes table. Returns the number of comments
+    whose stored values changed.
+    """
+    rows = db.query(
+        CommentVote.comment_id,
+        func.sum(case((CommentVote.vote_type == "up", 1), else_=0)),
+        func.sum(case((CommentVote.vote_type == "down", 1), else_=0))
+    ).group_by(CommentVote.comment_id).all()
+    actual = {row[0]: (row[1], row[2]) for row in rows}
+
+    mappings = []
+    for comment_id, upvotes, downvotes, best, hot, created_at in db.query(
+        Comment.id, Comment.upvotes, Comment.downvotes,
+        Comment.best_score, Comment.hot_score, Comment.created_at
+    ).all():
+        expected_up, expected_down = actual.get(comment_id, (0, 0))
+        expected = (
+            expected_up,
+            expected_down,
+            wilson_lower_bound(expected_up, expected_down),
+            hot_score(expected_up, expected_down, created_at),
+        )
+        if (upvotes, downvotes, best, hot) != expected:
+            mappings.append({
+                "id": comment_id,
+                "upvotes": expected[0],
+                "downvotes": expected[1],
+                "best_score": expected[2],
+                "hot_score": expected[3]
+            })
+
+    if mappings:
+        db.bulk_update_mappings(Comment, mappings)
+    db.commit()
+    return len(mappings)
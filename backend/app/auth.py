@@ -1,35 +1,43 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models import User
+from app.cache import TTLCache
+from app.passwords import get_context, password_hasher
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Resolved users are cached per token subject so authenticated requests do
+# not reload the user row every time. With AUTH_TRUST_TOKEN_CLAIMS the id and
+# is_active claims signed into the token are used without any lookup; a
+# deactivation then only takes effect once the token expires.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "60"))
+TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes", "on")
+
+principal_cache = TTLCache(max_entries=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
 
 # Bearer token scheme
 bearer_scheme = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    # jose (and the crypto backends it probes) is imported on first use to
+    # keep it out of worker start-up
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -39,18 +47,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # bcrypt runs on the dedicated hashing pool, not the event loop
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # Stored with a different cost than BCRYPT_ROUNDS; upgrade it
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
-):
+def invalidate_principal(username: str):
+    principal_cache.delete(username)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Covers is_active/profile changes and renames (old username too)
+    invalidate_principal(target.username)
+    for username in inspect(target).attrs.username.history.deleted:
+        invalidate_principal(username)
+
+def _decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
+    from jose import JWTError, jwt
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -63,10 +87,45 @@ async def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    return payload
+
+async def _load_principal(db: AsyncSession, username: str):
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
     
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Detach so the cached instance is never tied to a closed session
+    db.expunge(user)
+    principal_cache.set(username, user)
+    return user
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db)
+):
+    payload = _decode_token(credentials)
+    if TRUST_TOKEN_CLAIMS and "uid" in payload and "active" in payload:
+        # Only id, username and is_active are populated
+        return User(id=payload["uid"], username=payload["sub"], is_active=payload["active"])
+    return await _load_principal(db, payload["sub"])
+
+async def get_current_user_profile(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_db)
+):
+    """Like get_current_active_user, but always the full user record."""
+    payload = _decode_token(credentials)
+    user = await _load_principal(db, payload["sub"])
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
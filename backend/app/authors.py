@@ -0,0 +1,35 @@
+"""
+Normalized author data for list responses.
+
+Recipe and comment responses embed their author, so a page where a few
+users wrote most of the items repeats the same user objects over and over.
+With ``normalized=true`` the list endpoints instead return items that refer
+to their author by ``author_id``, plus a top-level ``authors`` map (user id
+-> User) holding each author once. The page is read without joining users;
+its authors are loaded afterwards with one IN query.
+"""
+
+from typing import Dict, Iterable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from app.models import User
+from app.schemas import User as UserSchema
+from app.serializers import serializer
+
+# The user columns the User schema returns; hashed_password stays behind
+USER_COLUMNS = tuple(getattr(User, name) for name in UserSchema.model_fields)
+
+async def load_authors(db: AsyncSession, items: Iterable) -> Dict[int, User]:
+    """The authors of ``items`` (anything with an ``author_id``), by id in ascending order."""
+    ids = sorted({item.author_id for item in items})
+    if not ids:
+        return {}
+    result = await db.execute(select(User).options(load_only(*USER_COLUMNS)).where(User.id.in_(ids)))
+    users = {user.id: user for user in result.scalars()}
+    return {user_id: users[user_id] for user_id in ids if user_id in users}
+
+def authors_dict(authors: Dict[int, User]) -> dict:
+    """``authors`` as the FAST_JSON path writes them."""
+    serialize = serializer(UserSchema)
+    return {user_id: serialize(user) for user_id, user in authors.items()}
@@ -0,0 +1,177 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses JSON and text responses of at least
+COMPRESSION_MIN_SIZE bytes with the best coding the client accepts
+(Accept-Encoding, q-values respected). Codings are tried in the order of
+COMPRESSION_ALGORITHMS: zstd (``pip install zstandard``) and br
+(``pip install brotli``) are used when their package is installed, gzip is
+always available. Each has its own level setting.
+
+Responses from the response cache arrive already compressed: a
+CachedResponse compresses its body once per coding and keeps the result
+(see app.response_cache), so hot responses are not recompressed on every
+hit. The middleware leaves responses that were negotiated already (they
+carry a Content-Encoding or vary on Accept-Encoding) alone, as well as
+streamed ones (more than one body message). A body that does not get
+smaller is sent as is.
+
+Every compressible response gets ``Vary: Accept-Encoding``, including the
+ones sent uncompressed, so shared caches do not hand one client's coding to
+another. A compressed response's ETag is weakened (``W/"..."``): the bytes
+differ from the identity response, but If-None-Match uses the weak
+comparison, so revalidation still matches.
+"""
+
+import gzip
+import logging
+import os
+from typing import Callable, Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger("app.compression")
+
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes", "on")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_ALGORITHMS = os.getenv("COMPRESSION_ALGORITHMS", "zstd,br,gzip")
+COMPRESSION_LEVELS = {
+    "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    "br": int(os.getenv("COMPRESSION_BROTLI_LEVEL", "4")),
+    "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def _gzip(level: int) -> Callable[[bytes], bytes]:
+    # mtime=0 keeps the output a pure function of the input
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+def _brotli(level: int) -> Callable[[bytes], bytes]:
+    import brotli
+    return lambda data: brotli.compress(data, quality=level)
+
+def _zstd(level: int) -> Callable[[bytes], bytes]:
+    import zstandard
+    # Compressor objects are not thread-safe; they are cheap to create
+    return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+
+CODEC_FACTORIES = {"gzip": _gzip, "br": _brotli, "zstd": _zstd}
+
+def make_codecs(names: str, levels: Dict[str, int]) -> Dict[str, Callable[[bytes], bytes]]:
+    """Compress functions for the available codings in ``names``, in preference order."""
+    codecs = {}
+    for name in (name.strip().lower() for name in names.split(",")):
+        if not name:
+            continue
+        if name not in CODEC_FACTORIES:
+            raise ValueError(f"Unknown compression algorithm: {name}")
+        try:
+            codecs[name] = CODEC_FACTORIES[name](levels[name])
+        except ImportError:
+            logger.info("Compression with %s is off: its package is not installed", name)
+    return codecs
+
+codecs = make_codecs(COMPRESSION_ALGORITHMS, COMPRESSION_LEVELS) if RESPONSE_COMPRESSION else {}
+
+def negotiate(accept_encoding: Optional[str], available: Optional[dict] = None) -> Optional[str]:
+    """The coding to answer ``accept_encoding`` with, or None for identity."""
+    available = codecs if available is None else available
+    if not accept_encoding or not available:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    default = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    # Highest q wins; ties go to the server's preference order
+    for name in available:
+        quality = accepted.get(name, default)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def _varies_on_encoding(headers: Headers) -> bool:
+    return "accept-encoding" in (name.strip().lower() for name in headers.get("vary", "").split(","))
+
+def vary_on_encoding(headers: MutableHeaders):
+    """Add ``Vary: Accept-Encoding`` unless the headers already have it."""
+    if not _varies_on_encoding(headers):
+        headers.add_vary_header("Accept-Encoding")
+
+def mark_encoded(headers: MutableHeaders, encoding: str):
+    """Headers of a response whose body was compressed with ``encoding``."""
+    headers["Content-Encoding"] = encoding
+    vary_on_encoding(headers)
+    etag = headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+def is_compressible(headers: Headers, size: int) -> bool:
+    """Whether the middleware negotiates a coding for this response."""
+    return (
+        size >= COMPRESSION_MIN_SIZE
+        and "content-encoding" not in headers
+        and not _varies_on_encoding(headers)
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+    )
+
+class CompressionMiddleware:
+    """Compresses single-message responses with the negotiated coding."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not codecs:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=held)
+            if (
+                held["status"] in (204, 304)
+                or message.get("more_body", False)
+                or not is_compressible(headers, len(body))
+            ):
+                await send(held)
+                await send(message)
+                return
+
+            # Another Accept-Encoding could get other bytes, even when this
+            # one gets the body as is
+            vary_on_encoding(headers)
+            if encoding is not None:
+                compressed = codecs[encoding](body)
+                if len(compressed) < len(body):
+                    mark_encoded(headers, encoding)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(held)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+            await send(held)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,109 @@
+"""
+Conditional GET support (ETag / Last-Modified).
+
+Validators come from small version fingerprints stored on the recipe row
+rather than from the response body: recipe detail uses the recipe's own
+timestamps and rating aggregates, a comment thread uses the recipe's
+comments_version counter (bumped on every comment and vote change). A
+matching If-None-Match, or If-Modified-Since when no ETag is sent, gets a
+304 built from that fingerprint alone, without loading or serializing the
+full response.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Recipe
+
+RECIPE_VERSION_COLUMNS = (
+    Recipe.id,
+    Recipe.created_at,
+    Recipe.updated_at,
+    Recipe.ratings_updated_at,
+    Recipe.rating_count,
+    Recipe.rating_sum,
+)
+
+THREAD_VERSION_COLUMNS = (
+    Recipe.id,
+    Recipe.created_at,
+    Recipe.comments_version,
+    Recipe.comments_updated_at,
+)
+
+def make_etag(*parts) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # SQLite hands back naive datetimes; they are stored as UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _latest(*values) -> Optional[datetime]:
+    values = [_utc(value) for value in values if value is not None]
+    return max(values) if values else None
+
+def recipe_validators(recipe) -> Tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified for a Recipe, or a row of RECIPE_VERSION_COLUMNS."""
+    etag = make_etag(
+        "recipe", recipe.id, _utc(recipe.updated_at or recipe.created_at),
+        recipe.rating_count, recipe.rating_sum
+    )
+    return etag, _latest(recipe.created_at, recipe.updated_at, recipe.ratings_updated_at)
+
+def thread_validators(recipe) -> Tuple[str, Optional[datetime]]:
+    """ETag and Last-Modified for a recipe's comments, from THREAD_VERSION_COLUMNS."""
+    etag = make_etag("comments", recipe.id, recipe.comments_version)
+    return etag, _latest(recipe.created_at, recipe.comments_updated_at)
+
+async def load_version(db: AsyncSession, recipe_id: int, columns):
+    result = await db.execute(select(*columns).where(Recipe.id == recipe_id))
+    return result.first()
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison and wins over If-Modified-Since
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        # HTTP dates have one second resolution
+        return last_modified.replace(microsecond=0) <= _utc(since)
+    return False
+
+def is_not_modified_headers(request: Request, headers: dict) -> bool:
+    """is_not_modified() for a stored response's ETag/Last-Modified headers."""
+    last_modified = headers.get("Last-Modified")
+    return is_not_modified(
+        request, headers["ETag"], parsedate_to_datetime(last_modified) if last_modified else None
+    )
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    # no-cache: caches may store the response but must revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
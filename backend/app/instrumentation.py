@@ -0,0 +1,136 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor execution hooks on every engine count the statements each request
+runs, the time spent in the database and how often the same parameterized
+statement repeats (the signature of an N+1 query). QueryStatsMiddleware
+reports the totals in a ``Server-Timing`` header and one structured log line
+per request on the ``app.sql`` logger; requests that repeat a statement more
+than SQL_REPEAT_THRESHOLD times are logged as warnings, or rejected with
+RepeatedQueryError when SQL_STRICT is on (meant for tests, see
+app.testing.strict_queries).
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("app.sql")
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() in ("1", "true", "yes", "on")
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+SQL_STRICT = os.getenv("SQL_STRICT", "false").lower() in ("1", "true", "yes", "on")
+
+class RepeatedQueryError(AssertionError):
+    pass
+
+class QueryStats:
+    """Statements run while handling one request."""
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, elapsed: float) -> int:
+        self.statements += 1
+        self.db_time += elapsed
+        self.shapes[statement] += 1
+        return self.shapes[statement]
+
+    def repeated(self, threshold: int) -> dict:
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.statements} queries", '
+            f"app;dur={total * 1000:.1f}"
+        )
+
+_current_stats: ContextVar = ContextVar("query_stats", default=None)
+
+def current_query_stats():
+    """Stats for the request being handled, or None outside a request."""
+    return _current_stats.get()
+
+class QueryMonitor:
+    def __init__(self, enabled: bool, repeat_threshold: int, strict: bool):
+        self.enabled = enabled
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+
+    def instrument(self, engine):
+        """Attach the cursor hooks to a sync or async engine."""
+        target = getattr(engine, "sync_engine", engine)
+        event.listen(target, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(target, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is None or not conn.info.get("query_start_time"):
+            return
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        count = stats.record(statement, elapsed)
+        if self.strict and count > self.repeat_threshold:
+            raise RepeatedQueryError(
+                f"Statement ran {count} times in one request "
+                f"(limit {self.repeat_threshold}): {statement}"
+            )
+
+    def log(self, scope, status_code, stats: QueryStats, total: float):
+        repeated = stats.repeated(self.repeat_threshold)
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "statements": stats.statements,
+            "db_ms": round(stats.db_time * 1000, 3),
+            "duration_ms": round(total * 1000, 3),
+        }
+        if repeated:
+            record["repeated"] = {shape[:200]: count for shape, count in repeated.items()}
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+query_monitor = QueryMonitor(SQL_INSTRUMENTATION, SQL_REPEAT_THRESHOLD, SQL_STRICT)
+
+class QueryStatsMiddleware:
+    """Collects QueryStats per HTTP request and reports them."""
+
+    def __init__(self, app, monitor: QueryMonitor = query_monitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.monitor.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self.monitor.log(scope, status_code, stats, time.perf_counter() - start)
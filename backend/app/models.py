@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
+from app.ranking import initial_hot_score
 
 class User(Base):
     __tablename__ = "users"
@@ -34,44 +35,105 @@ class Recipe(Base):
     servings = Column(Integer)
     difficulty = Column(String(20))  # easy, medium, hard
     image_url = Column(String(500))
-    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     is_published = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Denormalized rating aggregates, kept in step by the ratings router
+    rating_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_1_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5_count = Column(Integer, nullable=False, default=0, server_default="0")
+    ratings_updated_at = Column(DateTime(timezone=True))
+
+    # Bumped on every comment or vote change in this recipe's thread; the
+    # comments endpoint derives its ETag/Last-Modified from these
+    comments_version = Column(Integer, nullable=False, default=0, server_default="0")
+    comments_updated_at = Column(DateTime(timezone=True))
+
     # Relationships
     author = relationship("User", back_populates="recipes")
     comments = relationship("Comment", back_populates="recipe")
     ratings = relationship("Rating", back_populates="recipe")
 
+    __table_args__ = (
+        # The public listing: published recipes, newest (highest id) first
+        Index(
+            "ix_recipes_published", "id",
+            postgresql_where=is_published == True, sqlite_where=is_published == True
+        ),
+    )
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_distribution(self):
+        return {str(i): getattr(self, f"rating_{i}_count") for i in range(1, 6)}
+
 class Comment(Base):
     __tablename__ = "comments"
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
-    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     parent_id = Column(Integer, ForeignKey("comments.id"))  # for nested comments
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Denormalized vote tallies, kept in step by the comments router
+    upvotes = Column(Integer, nullable=False, default=0, server_default="0")
+    downvotes = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Ranking scores (see app/ranking.py), updated with the vote tallies
+    best_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    hot_score = Column(Float, nullable=False, default=initial_hot_score, server_default="0")
+
     # Relationships
     recipe = relationship("Recipe", back_populates="comments")
     author = relationship("User", back_populates="comments")
     parent = relationship("Comment", remote_side=[id])
     votes = relationship("CommentVote", back_populates="comment")
 
+    __table_args__ = (
+        # Top-level threads of a recipe and the replies of a comment, in id
+        # order (see app/threads.py)
+        Index("ix_comments_recipe_thread", "recipe_id", "parent_id", "id"),
+        Index("ix_comments_parent_id", "parent_id", "id"),
+        # ?sort=best|hot, read in index order
+        Index("ix_comments_recipe_best", "recipe_id", "best_score", "id"),
+        Index("ix_comments_recipe_hot", "recipe_id", "hot_score", "id"),
+        # A recipe's visible comments, newest first (?sort=new)
+        Index(
+            "ix_comments_recipe_active", "recipe_id", "id",
+            postgresql_where=is_active == True, sqlite_where=is_active == True
+        ),
+    )
+
 class Rating(Base):
     __tablename__ = "ratings"
 
     id = Column(Integer, primary_key=True, index=True)
     rating = Column(Float, nullable=False)  # 1.0 to 5.0
     recipe_id = Column(Integer, ForeignKey("recipes.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # One rating per user and recipe; the conflict target of app/upserts.py
+        Index("uq_ratings_recipe_user", "recipe_id", "user_id", unique=True),
+    )
+
     # Relationships
     recipe = relationship("Recipe", back_populates="ratings")
     user = relationship("User", back_populates="ratings")
@@ -82,9 +144,44 @@ class CommentVote(Base):
     id = Column(Integer, primary_key=True, index=True)
     vote_type = Column(String(10), nullable=False)  # 'up' or 'down'
     comment_id = Column(Integer, ForeignKey("comments.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # One vote per user and comment; the conflict target of app/upserts.py
+        Index("uq_comment_votes_comment_user", "comment_id", "user_id", unique=True),
+    )
+
     # Relationships
     comment = relationship("Comment", back_populates="votes")
-    user = relationship("User", back_populates="votes")
\ No newline at end of file
+    user = relationship("User", back_populates="votes")
+
+# Full-text search schema (see app/search.py). PostgreSQL gets a generated,
+# weighted tsvector column with a GIN index; SQLite gets an FTS5 table
+# whose rowid is the recipe id.
+SEARCH_CONFIG = "english"
+
+PG_SEARCH_DDL = [
+    f"""
+    ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(ingredients, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(title, description, ingredients)",
+]
+
+for _statement in PG_SEARCH_DDL:
+    event.listen(Recipe.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Recipe.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Recipe.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS recipes_fts").execute_if(dialect="sqlite")
+)
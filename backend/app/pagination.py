@@ -0,0 +1,68 @@
+import base64
+import json
+import time
+from threading import Lock
+from typing import Awaitable, Callable, Hashable, List
+from fastapi import HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TTL = 30  # seconds
+
+def encode_cursor(values: List) -> str:
+    """Opaque cursor for the (sort key..., id) of the last row on a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+async def count_rows(db: AsyncSession, query) -> int:
+    """COUNT(*) of the rows a select would return."""
+    result = await db.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+    return result.scalar_one()
+
+class CountCache:
+    """
+    Short-lived cache of COUNT(*) results.
+
+    Listing totals only need to be roughly right, so a count is reused for
+    COUNT_CACHE_TTL seconds instead of scanning the table on every request.
+    """
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = Lock()
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[int]]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = await compute()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {
+                    k: v for k, v in self._entries.items() if v[0] > now
+                }
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,154 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately slow, so hashing and verification run on a small,
+dedicated process pool instead of Starlette's shared threadpool. At most
+PASSWORD_HASH_QUEUE operations may be pending; beyond that requests fail
+fast with 503 rather than queueing behind a login storm.
+
+BCRYPT_ROUNDS sets the cost factor. Hashes made with a different cost are
+transparently re-hashed on the next successful login. To pick a cost for
+the current hardware run:
+
+    python -m app.passwords --target-ms 250
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import TYPE_CHECKING, Optional, Tuple
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", str(max(PASSWORD_HASH_WORKERS, 1) * 8)))
+
+def make_context(rounds: int = BCRYPT_ROUNDS) -> "CryptContext":
+    # Imported here: passlib is only needed once a password is hashed, and
+    # with PASSWORD_HASH_WORKERS > 0 that happens in the pool's processes
+    from passlib.context import CryptContext
+    # min/max desired rounds equal to the default make needs_update() flag
+    # hashes created with any other cost, in either direction
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_desired_rounds=rounds,
+        bcrypt__max_desired_rounds=rounds,
+    )
+
+# One context per cost factor, built on first use (in the API process and in
+# each worker process)
+_contexts = {}
+
+def _context(rounds: int) -> "CryptContext":
+    if rounds not in _contexts:
+        _contexts[rounds] = make_context(rounds)
+    return _contexts[rounds]
+
+def get_context() -> "CryptContext":
+    """The CryptContext for BCRYPT_ROUNDS."""
+    return _context(BCRYPT_ROUNDS)
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed)
+
+class PasswordHasher:
+    """Bounded front-end to the hashing process pool."""
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn rather than fork: the parent runs an event loop and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Returns (valid, new_hash); new_hash is set when the cost changed."""
+        return await self._run(_verify_and_update, password, hashed, self.rounds)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, BCRYPT_ROUNDS)
+
+def benchmark_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> int:
+    """Highest bcrypt cost whose median hash time stays within target_ms."""
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = make_context(rounds)
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.hash("benchmark-password")
+            timings.append((time.perf_counter() - start) * 1000)
+        median = sorted(timings)[len(timings) // 2]
+        print(f"rounds={rounds:2d}  {median:8.1f} ms")
+        if median > target_ms:
+            break
+        best = rounds
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost factor for this machine")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="target hash latency")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+    rounds = benchmark_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"\nRecommended: BCRYPT_ROUNDS={rounds}")
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from threading import Lock
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    NullPool,
+    QueuePool,
+    StaticPool,
+)
+
+# DB_POOL_CLASS values; the queue pool is swapped for its asyncio adapter
+# when building the async engine
+POOL_CLASSES = {
+    "queue": QueuePool,
+    "null": NullPool,
+    "static": StaticPool,
+}
+
+class PoolStats:
+    """Checkout counters for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {
+                "pool": type(self.pool).__name__ if self.pool else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + pool._max_overflow
+            data.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "saturation": round(pool.checkedout() / capacity, 3) if capacity > 0 else None,
+            })
+        return data
+
+class _TimedPoolMixin:
+    stats: PoolStats = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # recreate() builds a new instance of the same class after
+        # invalidation; point the shared stats at the live pool
+        self.stats.pool = self
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+# Stats for every engine built with pool_kwargs(), keyed by engine name
+pool_stats = {}
+
+def _env(name: str, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    return type(default)(value)
+
+def pool_kwargs(url: str, name: str, is_async: bool = False) -> dict:
+    """
+    create_engine()/create_async_engine() pool arguments for ``url``.
+
+    Every setting can be overridden from the environment (DB_POOL_CLASS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE); defaults depend on the dialect. In-memory SQLite
+    always uses a StaticPool because each connection would otherwise see
+    its own empty database.
+    """
+    parsed = make_url(url)
+    dialect = parsed.get_backend_name()
+    in_memory = dialect == "sqlite" and parsed.database in (None, "", ":memory:")
+
+    pool_name = "static" if in_memory else _env("DB_POOL_CLASS", "queue")
+    if pool_name not in POOL_CLASSES:
+        raise ValueError(f"Unknown DB_POOL_CLASS {pool_name!r}; expected one of {sorted(POOL_CLASSES)}")
+    base = POOL_CLASSES[pool_name]
+    if base is QueuePool and is_async:
+        base = AsyncAdaptedQueuePool
+
+    stats = PoolStats(name)
+    pool_stats[name] = stats
+    poolclass = type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"stats": stats})
+
+    kwargs = {"poolclass": poolclass}
+    if dialect == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if issubclass(base, QueuePool):
+        kwargs.update(
+            pool_size=_env("DB_POOL_SIZE", 5),
+            max_overflow=_env("DB_MAX_OVERFLOW", 10),
+            pool_timeout=_env("DB_POOL_TIMEOUT", 30.0),
+            pool_recycle=_env("DB_POOL_RECYCLE", 1800 if dialect != "sqlite" else -1),
+        )
+    if not in_memory:
+        kwargs["pool_pre_ping"] = _env("DB_POOL_PRE_PING", dialect != "sqlite")
+    return kwargs
+
+async def prewarm(engine, connections: int) -> int:
+    """
+    Open up to ``connections`` pooled connections at once and return them
+    to the pool, so the first requests do not pay for connecting. Capped at
+    the pool size; returns the number opened.
+    """
+    size = getattr(engine.pool, "size", None)
+    if connections <= 0 or size is None:
+        return 0
+    connections = min(connections, size())
+
+    # All are held open together, or the pool would hand out one twice
+    results = await asyncio.gather(
+        *(engine.connect().start() for _ in range(connections)), return_exceptions=True
+    )
+    opened = [result for result in results if not isinstance(result, BaseException)]
+    await asyncio.gather(*(connection.close() for connection in opened))
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(opened)
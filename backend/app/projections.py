@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets for the recipe listing.
+
+GET /api/recipes/ returns the "card" projection, the fields the recipe list
+page shows, unless ``fields`` asks for something else: a projection name or
+a comma-separated list of Recipe fields and projection names. Only the
+columns behind the requested fields are read (load_only), so the large
+ingredients and instructions columns stay in the database unless they are
+asked for.
+
+With ``normalized=true`` the author is returned as ``author_id`` and the
+page's authors once each, in a top-level map (see app.authors).
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, load_only
+from app.models import Recipe, User
+from app.schemas import Recipe as RecipeSchema, RecipeListResponse
+from app.serializers import FAST_JSON, serializer, dumps
+from app.authors import USER_COLUMNS, authors_dict
+
+RECIPE_FIELDS = tuple(RecipeSchema.model_fields)
+
+RECIPE_PROJECTIONS = {
+    "card": (
+        "id", "title", "description", "prep_time", "cook_time", "servings",
+        "difficulty", "image_url", "author", "average_rating", "rating_count", "created_at",
+    ),
+    "full": RECIPE_FIELDS,
+}
+DEFAULT_PROJECTION = "card"
+
+# Columns read for fields that are not columns of their own
+FIELD_COLUMNS = {
+    "author": (Recipe.author_id,),
+    "average_rating": (Recipe.rating_sum, Recipe.rating_count),
+}
+
+class RecipePage(NamedTuple):
+    """Unvalidated RecipeListResponse; rendered once, straight into the cache."""
+    recipes: List[Recipe]
+    total: Optional[int]
+    next_cursor: Optional[str]
+    authors: Optional[Dict[int, User]] = None
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """The Recipe fields ``fields`` asks for, in schema order; id is always included."""
+    requested = {"id"}
+    for name in (fields or DEFAULT_PROJECTION).split(","):
+        name = name.strip()
+        if name in RECIPE_PROJECTIONS:
+            requested.update(RECIPE_PROJECTIONS[name])
+        elif name in RECIPE_FIELDS:
+            requested.add(name)
+        elif name:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+    return tuple(field for field in RECIPE_FIELDS if field in requested)
+
+def normalize_fields(fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    """``fields`` with the embedded author replaced by its id."""
+    requested = (set(fields) - {"author"}) | {"author_id"}
+    return tuple(field for field in RECIPE_FIELDS if field in requested)
+
+def load_options(fields: Tuple[str, ...]) -> tuple:
+    """Loader options reading only the columns and relationships behind ``fields``."""
+    columns = []
+    for field in fields:
+        columns.extend(FIELD_COLUMNS.get(field) or (getattr(Recipe, field),))
+    options = [load_only(*columns)]
+    if "author" in fields:
+        options.append(joinedload(Recipe.author).load_only(*USER_COLUMNS))
+    return tuple(options)
+
+def render_page(page: RecipePage, fields: Tuple[str, ...], fast: bool = FAST_JSON) -> bytes:
+    """
+    ``page`` as RecipeListResponse JSON with only ``fields`` per recipe.
+    Attributes outside ``fields`` were never loaded, so neither path may
+    touch them.
+    """
+    if fast:
+        serialize = serializer(RecipeSchema, fields)
+        data = {
+            "recipes": [serialize(recipe) for recipe in page.recipes],
+            "total": page.total,
+            "next_cursor": page.next_cursor,
+        }
+        if page.authors is not None:
+            data["authors"] = authors_dict(page.authors)
+        return dumps(data)
+    response = RecipeListResponse(
+        recipes=[{field: getattr(recipe, field) for field in fields} for recipe in page.recipes],
+        total=page.total,
+        next_cursor=page.next_cursor,
+        **({"authors": page.authors} if page.authors is not None else {}),
+    )
+    return response.model_dump_json(exclude_unset=True).encode()
@@ -0,0 +1,40 @@
+"""
+Comment ranking scores, stored on each comment and indexed per recipe.
+
+``best`` is the lower bound of the Wilson score interval for the share of
+upvotes: a comment needs both a good ratio and enough votes to rank high.
+``hot`` adds the vote balance on a log scale to the creation time, so newer
+comments outrank older ones with the same votes. Neither depends on the
+current time, so both only change when a comment is voted on.
+"""
+
+import math
+from datetime import datetime, timezone
+
+WILSON_Z = 1.96  # 95% confidence
+
+# 45000 seconds (12.5 hours) of age are worth a factor of ten in votes
+HOT_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HOT_DECAY_SECONDS = 45000
+
+def wilson_lower_bound(upvotes: int, downvotes: int, z: float = WILSON_Z) -> float:
+    total = upvotes + downvotes
+    if total == 0:
+        return 0.0
+    share = upvotes / total
+    return (
+        share + z * z / (2 * total)
+        - z * math.sqrt((share * (1 - share) + z * z / (4 * total)) / total)
+    ) / (1 + z * z / total)
+
+def hot_score(upvotes: int, downvotes: int, created_at: datetime) -> float:
+    balance = upvotes - downvotes
+    order = math.log10(max(abs(balance), 1))
+    sign = (balance > 0) - (balance < 0)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return round(sign * order + (created_at - HOT_EPOCH).total_seconds() / HOT_DECAY_SECONDS, 7)
+
+def initial_hot_score() -> float:
+    """hot_score of a new comment with no votes."""
+    return hot_score(0, 0, datetime.now(timezone.utc))
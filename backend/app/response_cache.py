@@ -0,0 +1,292 @@
+"""
+Two-tier cache for serialized API responses.
+
+The first tier is an in-process LRU (app.cache.TTLCache). The optional
+second tier is a shared Redis (RESPONSE_CACHE_SHARED_URL=redis://...), so
+workers fill entries for each other; ``memory://`` selects an in-process
+stand-in with the same commands, for tests.
+
+Entries are tagged with what they were built from (``recipe:<id>``,
+``recipes:list``, ...). Writes invalidate tags, not keys: every tag has a
+version number and an entry is only served while the versions it was
+stored with are current. A write is seen immediately by the process that
+made it and by the shared tier; other processes' first tiers catch up
+within RESPONSE_CACHE_TTL.
+
+An entry is only stored if none of its tags were invalidated while it was
+being built (fill_token() is taken before the database is read). The
+shared tier has an invalidation clock for this: a fill that saw the clock
+move, by a write in any process, leaves the shared tier alone.
+
+Entries also keep their compressed bodies: the first request for an entry
+in a given Content-Encoding compresses it, later ones are served the stored
+bytes (see app.compression). The shared tier holds the uncompressed body.
+"""
+
+import json
+import logging
+import os
+import time
+from itertools import count
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from app.cache import TTLCache
+from app import compression
+
+logger = logging.getLogger("app.cache")
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "true").lower() in ("1", "true", "yes", "on")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "10"))
+RESPONSE_CACHE_SHARED_URL = os.getenv("RESPONSE_CACHE_SHARED_URL", "")
+RESPONSE_CACHE_SHARED_TTL = int(os.getenv("RESPONSE_CACHE_SHARED_TTL", "300"))
+
+# Tags used by the recipe endpoints
+LIST_TAG = "recipes:list"
+SEARCH_TAG = "recipes:search"
+
+def recipe_tag(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}"
+
+class MemoryBackend:
+    """In-process stand-in for the subset of the Redis API the cache uses."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = Lock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._live(key)
+
+    async def mget(self, keys) -> list:
+        with self._lock:
+            return [self._live(key) for key in keys]
+
+    async def set(self, key: str, value, ex: Optional[int] = None):
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+def make_shared_backend(url: str):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("RESPONSE_CACHE_SHARED_URL needs the 'redis' package installed")
+    return redis.from_url(url)
+
+class CachedResponse:
+    __slots__ = ("body", "headers", "tags", "encoded")
+
+    def __init__(self, body: bytes, headers: dict, tags: dict):
+        self.body = body
+        self.headers = headers
+        self.tags = tags
+        # Content-Encoding -> compressed body, filled on first use; None
+        # when compressing does not make the body smaller
+        self.encoded = {}
+
+    def response(self, request: Optional[Request] = None) -> Response:
+        """The stored response, compressed as ``request`` accepts if it is large enough."""
+        if request is None or len(self.body) < compression.COMPRESSION_MIN_SIZE or not compression.codecs:
+            return Response(content=self.body, headers=self.headers, media_type="application/json")
+
+        headers = MutableHeaders(headers=self.headers)
+        compression.vary_on_encoding(headers)
+        body = self.body
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            if encoding not in self.encoded:
+                compressed = compression.codecs[encoding](self.body)
+                self.encoded[encoding] = compressed if len(compressed) < len(self.body) else None
+            if self.encoded[encoding] is not None:
+                body = self.encoded[encoding]
+                compression.mark_encoded(headers, encoding)
+        return Response(content=body, headers=headers, media_type="application/json")
+
+class FillToken(NamedTuple):
+    """The invalidation clocks when a fill started; see ResponseCache.fill_token()."""
+    local: int
+    # None without a shared tier, or if it could not be read
+    shared: Optional[int] = None
+
+class ResponseCache:
+    def __init__(self, enabled: bool, local: TTLCache, shared=None, shared_ttl: int = 300,
+                 prefix: str = "rc:"):
+        self.enabled = enabled
+        self.local = local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.prefix = prefix
+        # Tag versions are values of one process-wide clock, so a fill can
+        # tell whether any of its tags were invalidated while it ran
+        self._clock = count(1)
+        self._now = 0
+        self._tag_versions = {}
+        self._lock = Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    def _local_versions(self, tags) -> dict:
+        return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    async def _shared_versions(self, tags) -> dict:
+        values = await self.shared.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def fill_token(self) -> FillToken:
+        """Taken before reading the database; pass to set()."""
+        shared = None
+        if self.enabled and self.shared is not None:
+            try:
+                shared = int(await self.shared.get(self.prefix + "clock") or 0)
+            except Exception as exc:
+                self.shared_errors += 1
+                logger.warning("Shared response cache read failed: %s", exc)
+        return FillToken(self._now, shared)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        entry = self.local.get(key)
+        stale = False
+        if entry is not None:
+            if entry.tags == self._local_versions(entry.tags):
+                self.local_hits += 1
+                return entry
+            stale = True
+            self.local.delete(key)
+
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(self.prefix + key)
+                if raw is not None:
+                    payload = json.loads(raw)
+                    if payload["tags"] == await self._shared_versions(list(payload["tags"])):
+                        entry = CachedResponse(
+                            payload["body"].encode(), payload["headers"],
+                            self._local_versions(payload["tags"])
+                        )
+                        self.local.set(key, entry)
+                        self.shared_hits += 1
+                        return entry
+                    stale = True
+            except Exception as exc:
+                self.shared_errors += 1
+                logger.warning("Shared response cache read failed: %s", exc)
+
+        self.stale += stale
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, body, headers: Optional[dict] = None,
+                  tags: Iterable[str] = (), token: Optional[FillToken] = None) -> CachedResponse:
+        """
+        Store a serialized response and return it. Nothing is stored if one
+        of ``tags`` was invalidated after ``token`` was taken; the shared
+        tier is skipped if anything was invalidated since, or if ``token``
+        has no shared clock.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        tags = sorted(set(tags))
+        entry = CachedResponse(body, dict(headers or {}), self._local_versions(tags))
+        if not self.enabled:
+            return entry
+        if token is not None and any(version > token.local for version in entry.tags.values()):
+            return entry
+
+        self.local.set(key, entry)
+        if self.shared is not None and (token is None or token.shared is not None):
+            try:
+                # The clock and the tag versions in one read: a tag
+                # invalidated after it is stale on its own
+                keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+                clock, *versions = await self.shared.mget([self.prefix + "clock", *keys])
+                if token is not None and int(clock or 0) != token.shared:
+                    return entry
+                payload = {
+                    "body": body.decode(),
+                    "headers": entry.headers,
+                    "tags": {tag: int(version or 0) for tag, version in zip(tags, versions)},
+                }
+                await self.shared.set(self.prefix + key, json.dumps(payload), ex=self.shared_ttl)
+            except Exception as exc:
+                self.shared_errors += 1
+                logger.warning("Shared response cache write failed: %s", exc)
+        return entry
+
+    async def invalidate(self, *tags: str):
+        """Drop every entry built from any of ``tags``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._now = next(self._clock)
+            for tag in tags:
+                self._tag_versions[tag] = self._now
+            self.invalidations += 1
+        if self.shared is not None:
+            try:
+                # The clock first, so fills that read the tags before they
+                # are bumped still see the clock move
+                await self.shared.incr(self.prefix + "clock")
+                for tag in tags:
+                    await self.shared.incr(f"{self.prefix}tag:{tag}")
+            except Exception as exc:
+                self.shared_errors += 1
+                logger.warning("Shared response cache invalidation failed: %s", exc)
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self) -> dict:
+        local = self.local.stats()
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": local["entries"],
+            "max_entries": local["max_entries"],
+            "evictions": local["evictions"],
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_ratio": round((self.local_hits + self.shared_hits) / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+            "shared_errors": self.shared_errors,
+        }
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE,
+    TTLCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL),
+    make_shared_backend(RESPONSE_CACHE_SHARED_URL),
+    RESPONSE_CACHE_SHARED_TTL,
+)
@@ -1,56 +1,216 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
-from app.models import Comment, User, CommentVote
-from app.schemas import Comment as CommentSchema, CommentCreate, CommentVoteCreate
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.database import get_db, get_read_db
+from app.models import Comment, User
+from app.schemas import (
+    Comment as CommentSchema, CommentCreate, CommentVoteCreate, CommentNode, CommentThreadPage,
+    NormalizedComment, NormalizedCommentNode, NormalizedCommentList, NormalizedCommentThreadPage
+)
 from app.auth import get_current_active_user
+from app.aggregates import apply_vote_change, touch_comment_thread, VOTE_COLUMNS
+from app import upserts
+from app.conditional import (
+    THREAD_VERSION_COLUMNS, thread_validators, load_version, is_not_modified,
+    not_modified, validator_headers
+)
+from app.pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from app.threads import (
+    load_thread, walk, sort_order, sort_cursor, after_cursor, MAX_THREAD_DEPTH, MAX_REPLIES_PER_COMMENT
+)
+from app.serializers import FAST_JSON, serializer, json_response
+from app.authors import load_authors, authors_dict
 
 router = APIRouter()
 
-@router.get("/recipe/{recipe_id}", response_model=List[CommentSchema])
-def read_recipe_comments(recipe_id: int, db: Session = Depends(get_db)):
-    comments = db.query(Comment).filter(
+# Relationships CommentSchema serializes, loaded with the comment row itself
+COMMENT_LOAD_OPTIONS = (joinedload(Comment.author),)
+
+NORMALIZED_DESCRIPTION = "Return each author once, in a top-level `authors` map"
+
+async def _load_comment(db: AsyncSession, comment_id: int, *options):
+    result = await db.execute(
+        select(Comment).options(*options).where(Comment.id == comment_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _check_thread_version(db: AsyncSession, recipe_id: int, request: Request, response: Response):
+    """A 304 response if the client's copy of the thread is current, else None."""
+    # The thread's version lives on the recipe row, so revalidating is a
+    # primary key lookup instead of loading every comment
+    version = await load_version(db, recipe_id, THREAD_VERSION_COLUMNS)
+    if version is None:
+        return None
+    etag, last_modified = thread_validators(version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    response.headers.update(validator_headers(etag, last_modified))
+    return None
+
+def _to_node(node: dict, normalized: bool = False):
+    comment_schema, node_schema = (
+        (NormalizedComment, NormalizedCommentNode) if normalized else (CommentSchema, CommentNode)
+    )
+    return node_schema(
+        **comment_schema.model_validate(node["comment"]).model_dump(),
+        depth=node["depth"],
+        reply_count=node["reply_count"],
+        replies=[_to_node(child, normalized) for child in node["replies"]],
+        replies_cursor=node["replies_cursor"],
+    )
+
+def _to_node_dict(node: dict, normalized: bool = False) -> dict:
+    """_to_node for the FAST_JSON path: the same fields, without validation."""
+    return {
+        **serializer(NormalizedComment if normalized else CommentSchema)(node["comment"]),
+        "depth": node["depth"],
+        "reply_count": node["reply_count"],
+        "replies": [_to_node_dict(child, normalized) for child in node["replies"]],
+        "replies_cursor": node["replies_cursor"],
+    }
+
+def _thread_page(nodes: list, next_cursor: Optional[str], authors=None, headers=None):
+    """The page of ``nodes``; normalized when ``authors`` are given."""
+    normalized = authors is not None
+    if FAST_JSON:
+        data = {
+            "comments": [_to_node_dict(node, normalized) for node in nodes],
+            "next_cursor": next_cursor,
+        }
+        if normalized:
+            data["authors"] = authors_dict(authors)
+        return json_response(data, headers)
+    comments = [_to_node(node, normalized) for node in nodes]
+    if normalized:
+        return NormalizedCommentThreadPage(comments=comments, next_cursor=next_cursor, authors=authors)
+    return CommentThreadPage(comments=comments, next_cursor=next_cursor)
+
+@router.get("/recipe/{recipe_id}", response_model=Union[List[CommentSchema], NormalizedCommentList])
+async def read_recipe_comments(
+    recipe_id: int,
+    request: Request,
+    response: Response,
+    sort: Optional[Literal["best", "hot", "new"]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    normalized: bool = Query(False, description=NORMALIZED_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    not_modified_response = await _check_thread_version(db, recipe_id, request, response)
+    if not_modified_response is not None:
+        return not_modified_response
+    
+    # Vote tallies and scores are stored on the comment row, so sorted
+    # pages are read straight off the per-recipe score indexes
+    query = select(Comment).where(
         Comment.recipe_id == recipe_id,
         Comment.is_active == True
-    ).all()
-    
-    # Add vote counts to each comment
-    for comment in comments:
-        upvotes = db.query(CommentVote).filter(
-            CommentVote.comment_id == comment.id,
-            CommentVote.vote_type == "up"
-        ).count()
-        downvotes = db.query(CommentVote).filter(
-            CommentVote.comment_id == comment.id,
-            CommentVote.vote_type == "down"
-        ).count()
-        comment.upvotes = upvotes
-        comment.downvotes = downvotes
+    )
+    if not normalized:
+        query = query.options(*COMMENT_LOAD_OPTIONS)
+    if sort is not None:
+        query = query.order_by(*sort_order(sort))
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    comments = result.scalars().all()
     
+    if normalized:
+        authors = await load_authors(db, comments)
+        if FAST_JSON:
+            serialize = serializer(NormalizedComment)
+            return json_response({
+                "comments": [serialize(comment) for comment in comments],
+                "authors": authors_dict(authors),
+            }, response.headers)
+        return NormalizedCommentList(comments=comments, authors=authors)
+    if FAST_JSON:
+        # A returned Response skips the injected one, so carry its validators over
+        serialize = serializer(CommentSchema)
+        return json_response([serialize(comment) for comment in comments], response.headers)
     return comments
 
+@router.get("/recipe/{recipe_id}/thread", response_model=Union[CommentThreadPage, NormalizedCommentThreadPage])
+async def read_recipe_thread(
+    recipe_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    depth: int = Query(3, ge=0, le=MAX_THREAD_DEPTH),
+    replies: int = Query(5, ge=1, le=MAX_REPLIES_PER_COMMENT),
+    sort: Literal["best", "hot", "new"] = Query("new"),
+    cursor: Optional[str] = Query(None),
+    normalized: bool = Query(False, description=NORMALIZED_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Nested comment tree, paginated by top-level thread in ``sort`` order.
+    Each comment includes up to ``replies`` replies, ``depth`` levels deep;
+    follow ``replies_cursor`` to /api/comments/{id}/replies for the rest.
+    """
+    not_modified_response = await _check_thread_version(db, recipe_id, request, response)
+    if not_modified_response is not None:
+        return not_modified_response
+    
+    anchor = and_(Comment.recipe_id == recipe_id, Comment.parent_id.is_(None))
+    if cursor is not None:
+        anchor = and_(anchor, after_cursor(sort, cursor))
+    nodes, has_more = await load_thread(db, anchor, sort, limit, depth, replies, not normalized)
+    
+    return _thread_page(
+        nodes,
+        sort_cursor(nodes[-1]["comment"], sort) if has_more else None,
+        await load_authors(db, walk(nodes)) if normalized else None,
+        response.headers
+    )
+
+@router.get("/{comment_id}/replies", response_model=Union[CommentThreadPage, NormalizedCommentThreadPage])
+async def read_comment_replies(
+    comment_id: int,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    depth: int = Query(3, ge=0, le=MAX_THREAD_DEPTH),
+    replies: int = Query(5, ge=1, le=MAX_REPLIES_PER_COMMENT),
+    cursor: Optional[str] = Query(None),
+    normalized: bool = Query(False, description=NORMALIZED_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Replies to one comment (oldest first), as nested trees like the thread endpoint."""
+    anchor = Comment.parent_id == comment_id
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        anchor = and_(anchor, Comment.id > last_id)
+    nodes, has_more = await load_thread(db, anchor, None, limit, depth, replies, not normalized)
+    
+    return _thread_page(
+        nodes,
+        encode_cursor([nodes[-1]["comment"].id]) if has_more else None,
+        await load_authors(db, walk(nodes)) if normalized else None
+    )
+
 @router.post("/", response_model=CommentSchema)
-def create_comment(
+async def create_comment(
     comment: CommentCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     db_comment = Comment(**comment.dict(), author_id=current_user.id)
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    return db_comment
+    await touch_comment_thread(db, comment.recipe_id)
+    await db.commit()
+    return await _load_comment(db, db_comment.id, *COMMENT_LOAD_OPTIONS)
 
 @router.put("/{comment_id}", response_model=CommentSchema)
-def update_comment(
+async def update_comment(
     comment_id: int,
     content: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await _load_comment(db, comment_id)
     if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     
@@ -58,17 +218,17 @@ def update_comment(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     comment.content = content
-    db.commit()
-    db.refresh(comment)
-    return comment
+    await touch_comment_thread(db, comment.recipe_id)
+    await db.commit()
+    return await _load_comment(db, comment_id, *COMMENT_LOAD_OPTIONS)
 
 @router.delete("/{comment_id}")
-def delete_comment(
+async def delete_comment(
     comment_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await _load_comment(db, comment_id)
     if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
     
@@ -76,57 +236,43 @@ def delete_comment(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     comment.is_active = False
-    db.commit()
+    await touch_comment_thread(db, comment.recipe_id)
+    await db.commit()
     return {"message": "Comment deleted successfully"}
 
 @router.post("/{comment_id}/vote")
-def vote_comment(
+async def vote_comment(
     comment_id: int,
     vote: CommentVoteCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Check if comment exists
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
-    if comment is None:
-        raise HTTPException(status_code=404, detail="Comment not found")
+    if vote.vote_type not in VOTE_COLUMNS:
+        raise HTTPException(status_code=400, detail="Vote type must be 'up' or 'down'")
     
-    # Check if user already voted
-    existing_vote = db.query(CommentVote).filter(
-        CommentVote.comment_id == comment_id,
-        CommentVote.user_id == current_user.id
-    ).first()
+    # Insert or change the vote in one statement; the unique
+    # (comment_id, user_id) index turns a second vote into an update
+    written = await upserts.upsert_vote(db, comment_id, current_user.id, vote.vote_type)
+    if written is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    _, previous = written
     
-    if existing_vote:
-        # Update existing vote
-        existing_vote.vote_type = vote.vote_type
-        db.commit()
-        return {"message": "Vote updated successfully"}
-    else:
-        # Create new vote
-        db_vote = CommentVote(
-            comment_id=comment_id,
-            user_id=current_user.id,
-            vote_type=vote.vote_type
-        )
-        db.add(db_vote)
-        db.commit()
+    await apply_vote_change(db, comment_id, old_type=previous, new_type=vote.vote_type)
+    await db.commit()
+    if previous is None:
         return {"message": "Vote added successfully"}
+    return {"message": "Vote updated successfully"}
 
 @router.delete("/{comment_id}/vote")
-def remove_vote(
+async def remove_vote(
     comment_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    vote = db.query(CommentVote).filter(
-        CommentVote.comment_id == comment_id,
-        CommentVote.user_id == current_user.id
-    ).first()
-    
-    if vote is None:
+    vote_type = await upserts.delete_vote(db, comment_id, current_user.id)
+    if vote_type is None:
         raise HTTPException(status_code=404, detail="Vote not found")
     
-    db.delete(vote)
-    db.commit()
+    await apply_vote_change(db, comment_id, old_type=vote_type)
+    await db.commit()
     return {"message": "Vote removed successfully"}
\ No newline at end of file
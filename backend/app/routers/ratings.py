@@ -1,96 +1,96 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from app.database import get_db, get_read_db
 from app.models import Rating, User, Recipe
 from app.schemas import Rating as RatingSchema, RatingCreate
 from app.auth import get_current_active_user
+from app.aggregates import apply_rating_change
+from app import upserts
+from app.response_cache import response_cache, recipe_tag
 
 router = APIRouter()
 
 @router.post("/", response_model=RatingSchema)
-def create_rating(
+async def create_rating(
     rating: RatingCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == rating.recipe_id).first()
-    if recipe is None:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    
     # Validate rating value
     if rating.rating < 1.0 or rating.rating > 5.0:
         raise HTTPException(status_code=400, detail="Rating must be between 1.0 and 5.0")
     
-    # Check if user already rated this recipe
-    existing_rating = db.query(Rating).filter(
-        Rating.recipe_id == rating.recipe_id,
-        Rating.user_id == current_user.id
-    ).first()
+    # Insert or replace in one statement; the unique (recipe_id, user_id)
+    # index turns a second rating into an update of the first
+    written = await upserts.upsert_rating(db, rating.recipe_id, current_user.id, rating.rating)
+    if written is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    db_rating, previous = written
     
-    if existing_rating:
-        # Update existing rating
-        existing_rating.rating = rating.rating
-        db.commit()
-        db.refresh(existing_rating)
-        return existing_rating
-    else:
-        # Create new rating
-        db_rating = Rating(
-            recipe_id=rating.recipe_id,
-            user_id=current_user.id,
-            rating=rating.rating
-        )
-        db.add(db_rating)
-        db.commit()
-        db.refresh(db_rating)
-        return db_rating
+    await apply_rating_change(db, rating.recipe_id, old_value=previous, new_value=rating.rating)
+    await db.commit()
+    await response_cache.invalidate(recipe_tag(rating.recipe_id))
+    return db_rating
+
+MAX_STATS_BATCH = 100
+
+def _rating_stats(recipe: Recipe) -> dict:
+    return {
+        "average_rating": recipe.average_rating,
+        "rating_count": recipe.rating_count,
+        "rating_distribution": recipe.rating_distribution
+    }
+
+def _rating_stats_query():
+    # Statistics come from the aggregates maintained on the recipe row, so
+    # this is a single query no matter how many ratings a recipe has
+    return select(Recipe).options(load_only(
+        Recipe.rating_sum,
+        Recipe.rating_count,
+        Recipe.rating_1_count,
+        Recipe.rating_2_count,
+        Recipe.rating_3_count,
+        Recipe.rating_4_count,
+        Recipe.rating_5_count
+    ))
+
+@router.get("/recipes")
+async def get_recipes_ratings(
+    ids: List[int] = Query(..., max_length=MAX_STATS_BATCH),
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(_rating_stats_query().where(Recipe.id.in_(set(ids))))
+    recipes = result.scalars().all()
+    return {str(recipe.id): _rating_stats(recipe) for recipe in recipes}
 
 @router.get("/recipe/{recipe_id}")
-def get_recipe_ratings(recipe_id: int, db: Session = Depends(get_db)):
-    # Check if recipe exists
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+async def get_recipe_ratings(recipe_id: int, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(_rating_stats_query().where(Recipe.id == recipe_id))
+    recipe = result.scalars().first()
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    # Get rating statistics
-    ratings = db.query(Rating).filter(Rating.recipe_id == recipe_id).all()
-    avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == recipe_id).scalar()
-    rating_count = len(ratings)
-    
-    # Get rating distribution
-    rating_distribution = {}
-    for i in range(1, 6):
-        count = db.query(Rating).filter(
-            Rating.recipe_id == recipe_id,
-            Rating.rating >= i,
-            Rating.rating < i + 1
-        ).count()
-        rating_distribution[str(i)] = count
-    
-    return {
-        "average_rating": round(avg_rating, 2) if avg_rating else None,
-        "rating_count": rating_count,
-        "rating_distribution": rating_distribution
-    }
+    return _rating_stats(recipe)
 
 @router.get("/user/{user_id}/recipe/{recipe_id}", response_model=RatingSchema)
-def get_user_rating(
+async def get_user_rating(
     user_id: int,
     recipe_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Users can only view their own ratings unless they're viewing a public recipe
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    rating = db.query(Rating).filter(
+    result = await db.execute(select(Rating).where(
         Rating.recipe_id == recipe_id,
         Rating.user_id == user_id
-    ).first()
+    ))
+    rating = result.scalars().first()
     
     if rating is None:
         raise HTTPException(status_code=404, detail="Rating not found")
@@ -98,19 +98,16 @@ def get_user_rating(
     return rating
 
 @router.delete("/recipe/{recipe_id}")
-def delete_rating(
+async def delete_rating(
     recipe_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    rating = db.query(Rating).filter(
-        Rating.recipe_id == recipe_id,
-        Rating.user_id == current_user.id
-    ).first()
-    
-    if rating is None:
+    value = await upserts.delete_rating(db, recipe_id, current_user.id)
+    if value is None:
         raise HTTPException(status_code=404, detail="Rating not found")
     
-    db.delete(rating)
-    db.commit()
+    await apply_rating_change(db, recipe_id, old_value=value)
+    await db.commit()
+    await response_cache.invalidate(recipe_tag(recipe_id))
     return {"message": "Rating deleted successfully"}
\ No newline at end of file
@@ -1,78 +1,202 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
-from app.models import Recipe, User, Rating
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app.database import get_db, get_read_db
+from app.models import Recipe, User
 from app.schemas import Recipe as RecipeSchema, RecipeCreate, RecipeUpdate, RecipeListResponse
 from app.auth import get_current_active_user
+from app.pagination import MAX_PAGE_SIZE, CountCache, encode_cursor, decode_cursor, count_rows
+from app.search import apply_search, after_rank, index_recipe, unindex_recipe
+from app.conditional import (
+    RECIPE_VERSION_COLUMNS, recipe_validators, load_version, is_conditional,
+    is_not_modified, is_not_modified_headers, not_modified, validator_headers
+)
+from app.response_cache import response_cache, recipe_tag, LIST_TAG, SEARCH_TAG
+from app.serializers import render
+from app.projections import RecipePage, parse_fields, normalize_fields, load_options, render_page
+from app.authors import load_authors
 
 router = APIRouter()
 
+recipe_counts = CountCache()
+
+# Relationships RecipeSchema serializes, loaded with the recipe row itself
+RECIPE_LOAD_OPTIONS = (joinedload(Recipe.author),)
+
+async def _load_recipe(db: AsyncSession, recipe_id: int, *options):
+    result = await db.execute(
+        select(Recipe).options(*options).where(Recipe.id == recipe_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 @router.get("/", response_model=RecipeListResponse)
-def read_recipes(
-    skip: int = 0,
-    limit: int = 100,
+async def read_recipes(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(
+        None, description="`card` (default), `full`, or a comma-separated list of fields"
+    ),
+    normalized: bool = Query(False, description="Return each author once, in a top-level `authors` map"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Recipe).filter(Recipe.is_published == True)
+    # Larger pages are served at the cap rather than rejected, as older
+    # clients ask for them
+    limit = min(limit, MAX_PAGE_SIZE)
+    fields = parse_fields(fields)
+    with_authors = normalized and "author" in fields
+    if with_authors:
+        fields = normalize_fields(fields)
+    # Equivalent requests share a cache entry
+    search = " ".join(search.lower().split()) if search else None
+    key = (
+        f"recipes:list:{skip}:{limit}:{search or ''}:{cursor or ''}:{include_total}:"
+        f"{','.join(fields)}:{with_authors}"
+    )
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached.response(request)
+    
+    token = await response_cache.fill_token()
+    page = await _list_recipes(db, skip, limit, search, cursor, include_total, fields)
+    if with_authors:
+        page = page._replace(authors=await load_authors(db, page.recipes))
+    tags = [LIST_TAG, *(recipe_tag(recipe.id) for recipe in page.recipes)]
+    if search:
+        tags.append(SEARCH_TAG)
+    entry = await response_cache.set(key, render_page(page, fields), tags=tags, token=token)
+    return entry.response(request)
+
+async def _list_recipes(
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    cursor: Optional[str],
+    include_total: Optional[bool],
+    fields: tuple
+) -> RecipePage:
+    query = select(Recipe).where(Recipe.is_published == True)
     
+    rank = None
     if search:
-        query = query.filter(Recipe.title.contains(search))
+        query, rank = apply_search(db, query, search)
     
-    # Get total count before applying pagination
-    total = query.count()
+    # Totals are exact for skip/limit clients unless they opt out; cursor
+    # clients only get one on request, served from a short-lived cache
+    total = None
+    if cursor is None and include_total is not False:
+        total = await count_rows(db, query)
+    elif include_total:
+        total = await recipe_counts.get(search or "", lambda: count_rows(db, query))
     
-    # Apply pagination
-    recipes = query.offset(skip).limit(limit).all()
+    # Only the columns behind the requested fields are read
+    query = query.options(*load_options(fields))
     
-    # Add average rating to each recipe
-    for recipe in recipes:
-        avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == recipe.id).scalar()
-        rating_count = db.query(Rating).filter(Rating.recipe_id == recipe.id).count()
-        recipe.average_rating = round(avg_rating, 2) if avg_rating else None
-        recipe.rating_count = rating_count
+    # Search results are ordered by relevance, everything else newest first;
+    # id is unique so it doubles as the tie-breaker
+    if rank is not None:
+        query = query.add_columns(rank).order_by(rank.desc(), Recipe.id.desc())
+    else:
+        query = query.order_by(Recipe.id.desc())
+    if cursor is not None:
+        if rank is not None:
+            last_rank, last_id = decode_cursor(cursor, 2)
+            valid = isinstance(last_rank, (int, float)) and isinstance(last_id, int)
+        else:
+            (last_id,) = decode_cursor(cursor, 1)
+            valid = isinstance(last_id, int)
+        if not valid:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if rank is not None:
+            query = query.filter(after_rank(rank, last_rank, last_id))
+        else:
+            query = query.filter(Recipe.id < last_id)
+    else:
+        query = query.offset(skip)
     
-    return RecipeListResponse(
+    # Fetch one extra row to know whether another page follows;
+    # rating aggregates are stored on the recipe row itself
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all() if rank is not None else result.scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if rank is not None:
+            next_cursor = encode_cursor([last[1], last[0].id])
+        else:
+            next_cursor = encode_cursor([last.id])
+    recipes = [row[0] for row in rows] if rank is not None else rows
+    
+    return RecipePage(
         recipes=recipes,
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
 @router.post("/", response_model=RecipeSchema)
-def create_recipe(
+async def create_recipe(
     recipe: RecipeCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     db_recipe = Recipe(**recipe.dict(), author_id=current_user.id)
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
-    return db_recipe
+    await db.flush()
+    await index_recipe(db, db_recipe)
+    await db.commit()
+    # A new recipe shifts every list page
+    await response_cache.invalidate(LIST_TAG)
+    return await _load_recipe(db, db_recipe.id, *RECIPE_LOAD_OPTIONS)
 
 @router.get("/{recipe_id}", response_model=RecipeSchema)
-def read_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+async def read_recipe(
+    recipe_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    key = recipe_tag(recipe_id)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        if is_not_modified_headers(request, cached.headers):
+            return Response(status_code=304, headers=cached.headers)
+        return cached.response(request)
+    
+    # Revalidations are answered from the version columns alone
+    if is_conditional(request):
+        version = await load_version(db, recipe_id, RECIPE_VERSION_COLUMNS)
+        if version is not None and is_not_modified(request, *recipe_validators(version)):
+            return not_modified(*recipe_validators(version))
+    
+    token = await response_cache.fill_token()
+    recipe = await _load_recipe(db, recipe_id, *RECIPE_LOAD_OPTIONS)
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    # Add average rating
-    avg_rating = db.query(func.avg(Rating.rating)).filter(Rating.recipe_id == recipe.id).scalar()
-    rating_count = db.query(Rating).filter(Rating.recipe_id == recipe.id).count()
-    recipe.average_rating = round(avg_rating, 2) if avg_rating else None
-    recipe.rating_count = rating_count
-    
-    return recipe
+    entry = await response_cache.set(
+        key,
+        render(RecipeSchema, recipe),
+        headers=validator_headers(*recipe_validators(recipe)),
+        tags=[key],
+        token=token
+    )
+    return entry.response(request)
 
 @router.put("/{recipe_id}", response_model=RecipeSchema)
-def update_recipe(
+async def update_recipe(
     recipe_id: int,
     recipe_update: RecipeUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    recipe = await _load_recipe(db, recipe_id)
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
@@ -83,23 +207,31 @@ def update_recipe(
     for field, value in update_data.items():
         setattr(recipe, field, value)
     
-    db.commit()
-    db.refresh(recipe)
-    return recipe
+    await index_recipe(db, recipe)
+    await db.commit()
+    # Plain lists only change if they contain the recipe; search results
+    # may gain or lose it
+    await response_cache.invalidate(recipe_tag(recipe_id), SEARCH_TAG)
+    return await _load_recipe(db, recipe_id, *RECIPE_LOAD_OPTIONS)
 
 @router.delete("/{recipe_id}")
-def delete_recipe(
+async def delete_recipe(
     recipe_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    # The ORM processes the child collections when deleting the recipe
+    recipe = await _load_recipe(
+        db, recipe_id, selectinload(Recipe.comments), selectinload(Recipe.ratings)
+    )
     if recipe is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     if recipe.author_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    db.delete(recipe)
-    db.commit()
+    await db.delete(recipe)
+    await unindex_recipe(db, recipe_id)
+    await db.commit()
+    await response_cache.invalidate(recipe_tag(recipe_id), LIST_TAG)
     return {"message": "Recipe deleted successfully"}
\ No newline at end of file
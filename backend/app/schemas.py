@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 # User schemas
@@ -66,10 +66,33 @@ class Recipe(RecipeBase):
     class Config:
         from_attributes = True
 
+class RecipeFields(BaseModel):
+    """A Recipe with only the requested fields (GET /api/recipes/?fields=)."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    ingredients: Optional[str] = None
+    instructions: Optional[str] = None
+    prep_time: Optional[int] = None
+    cook_time: Optional[int] = None
+    servings: Optional[int] = None
+    difficulty: Optional[str] = None
+    image_url: Optional[str] = None
+    id: int
+    author_id: Optional[int] = None
+    is_published: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    author: Optional[User] = None
+    average_rating: Optional[float] = None
+    rating_count: Optional[int] = None
+
 # Paginated response schema
 class RecipeListResponse(BaseModel):
-    recipes: List["Recipe"]
-    total: int
+    recipes: List[RecipeFields]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+    # With ?normalized=true: recipes carry author_id, their authors are here
+    authors: Optional[Dict[int, User]] = None
 
 # Comment schemas
 class CommentBase(BaseModel):
@@ -90,10 +113,55 @@ class Comment(CommentBase):
     author: User
     upvotes: int = 0
     downvotes: int = 0
+    best_score: float = 0.0
+    hot_score: float = 0.0
 
     class Config:
         from_attributes = True
 
+class CommentNode(Comment):
+    depth: int
+    reply_count: int = 0
+    replies: List["CommentNode"] = []
+    replies_cursor: Optional[str] = None
+
+class CommentThreadPage(BaseModel):
+    comments: List[CommentNode]
+    next_cursor: Optional[str] = None
+
+# Normalized comment responses (?normalized=true): comments carry author_id
+# and each author appears once, in the top-level authors map
+class NormalizedComment(CommentBase):
+    id: int
+    recipe_id: int
+    author_id: int
+    parent_id: Optional[int] = None
+    is_active: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    upvotes: int = 0
+    downvotes: int = 0
+    best_score: float = 0.0
+    hot_score: float = 0.0
+
+    class Config:
+        from_attributes = True
+
+class NormalizedCommentNode(NormalizedComment):
+    depth: int
+    reply_count: int = 0
+    replies: List["NormalizedCommentNode"] = []
+    replies_cursor: Optional[str] = None
+
+class NormalizedCommentList(BaseModel):
+    comments: List[NormalizedComment]
+    authors: Dict[int, User]
+
+class NormalizedCommentThreadPage(BaseModel):
+    comments: List[NormalizedCommentNode]
+    next_cursor: Optional[str] = None
+    authors: Dict[int, User]
+
 # Rating schemas
 class RatingBase(BaseModel):
     rating: float
@@ -0,0 +1,106 @@
+"""
+Full-text recipe search over title, description and ingredients.
+
+On PostgreSQL recipes carry a generated, weighted ``search_vector`` tsvector
+column with a GIN index, ranked with ts_rank. On SQLite an FTS5 table
+(recipes_fts, rowid = recipe id) is kept in sync by the recipe handlers and
+ranked with bm25. Other databases fall back to a title substring match.
+"""
+
+from sqlalchemy import Integer, Float, text, func, literal_column, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import Recipe, SEARCH_CONFIG, PG_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+# bm25 column weights for title, description and ingredients
+_SQLITE_WEIGHTS = "10.0, 4.0, 1.0"
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+def create_search_schema(connection):
+    """Create the dialect's search column/table if it does not exist yet."""
+    dialect = _dialect(connection)
+    if dialect == "postgresql":
+        statements = PG_SEARCH_DDL
+    elif dialect == "sqlite":
+        statements = SQLITE_SEARCH_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+async def index_recipe(db: AsyncSession, recipe: Recipe):
+    """Add or refresh a recipe in the search index (SQLite only; PG is generated)."""
+    if _dialect(db.bind) != "sqlite":
+        return
+    await db.execute(text("DELETE FROM recipes_fts WHERE rowid = :id"), {"id": recipe.id})
+    await db.execute(
+        text(
+            "INSERT INTO recipes_fts (rowid, title, description, ingredients) "
+            "VALUES (:id, :title, :description, :ingredients)"
+        ),
+        {
+            "id": recipe.id,
+            "title": recipe.title,
+            "description": recipe.description or "",
+            "ingredients": recipe.ingredients,
+        },
+    )
+
+async def unindex_recipe(db: AsyncSession, recipe_id: int):
+    if _dialect(db.bind) != "sqlite":
+        return
+    await db.execute(text("DELETE FROM recipes_fts WHERE rowid = :id"), {"id": recipe_id})
+
+def rebuild_search_index(db: Session) -> int:
+    """Create the search schema if missing and (on SQLite) repopulate it."""
+    create_search_schema(db.connection())
+    count = db.query(Recipe).count()
+    if _dialect(db.get_bind()) == "sqlite":
+        db.execute(text("DELETE FROM recipes_fts"))
+        db.execute(text(
+            "INSERT INTO recipes_fts (rowid, title, description, ingredients) "
+            "SELECT id, title, coalesce(description, ''), ingredients FROM recipes"
+        ))
+    db.commit()
+    return count
+
+def _fts5_query(search: str) -> str:
+    # Quote every term so user input cannot use FTS5 query syntax; the
+    # last term is a prefix match so results appear while typing
+    terms = ['"' + term.replace('"', '""') + '"' for term in search.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def apply_search(db: AsyncSession, query, search: str):
+    """
+    Restrict a Recipe select to matches for ``search``.
+
+    Returns the filtered select and a rank expression (higher is better), or
+    None as the rank when the database has no full-text support.
+    """
+    dialect = _dialect(db.bind)
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, search)
+        vector = literal_column("recipes.search_vector")
+        rank = func.ts_rank(vector, tsquery)
+        return query.filter(vector.op("@@")(tsquery)), rank
+    if dialect == "sqlite":
+        fts_query = _fts5_query(search)
+        if not fts_query:
+            return query, None
+        matches = text(
+            f"SELECT rowid AS recipe_id, -bm25(recipes_fts, {_SQLITE_WEIGHTS}) AS rank "
+            "FROM recipes_fts WHERE recipes_fts MATCH :fts_query"
+        ).bindparams(fts_query=fts_query).columns(
+            recipe_id=Integer, rank=Float
+        ).subquery("matches")
+        query = query.join(matches, matches.c.recipe_id == Recipe.id)
+        return query, matches.c.rank
+    return query.filter(Recipe.title.contains(search)), None
+
+def after_rank(rank, last_rank: float, last_id: int):
+    """Keyset condition for rows ranked after (last_rank, last_id)."""
+    return or_(rank < last_rank, and_(rank == last_rank, Recipe.id < last_id))
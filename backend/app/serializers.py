@@ -0,0 +1,108 @@
+"""
+Fast JSON rendering for the hot read endpoints.
+
+Routes normally return ORM objects and let FastAPI validate them against
+their response_model (from_attributes) and then serialize the validated
+models again. With FAST_JSON=true the recipe and comment read endpoints
+skip both steps: each schema gets a serializer, compiled once, that copies
+its fields straight off the rows into dicts, and the dicts are encoded by
+orjson (``pip install orjson``; the stdlib json module stands in when it
+is missing). Routes keep their response_model, so the OpenAPI schema does
+not change, and the bytes match what pydantic would have produced.
+
+Nothing is validated on the fast path: it is only for rows that already
+satisfy their schema, i.e. rows read from our own tables.
+"""
+
+import json
+import os
+import typing
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import Any, Callable, Optional, Type
+from fastapi import Response
+from pydantic import BaseModel
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes", "on")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, time)):
+        text = value.isoformat()
+        # pydantic writes UTC as Z
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(data) -> bytes:
+        return _encoder.encode(data).encode()
+
+def _nested_model(annotation) -> tuple:
+    """(model, is_list, is_optional) for fields holding other schemas, else (None, ...)."""
+    optional = False
+    args = typing.get_args(annotation)
+    if typing.get_origin(annotation) is typing.Union and type(None) in args:
+        optional = True
+        rest = [arg for arg in args if arg is not type(None)]
+        annotation = rest[0] if len(rest) == 1 else annotation
+    is_list = typing.get_origin(annotation) is list
+    if is_list:
+        annotation = typing.get_args(annotation)[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list, optional
+    return None, False, False
+
+@lru_cache(maxsize=None)
+def serializer(schema: Type[BaseModel], fields: Optional[tuple] = None) -> Callable[[Any], dict]:
+    """
+    Function turning an object with ``schema``'s fields as attributes into
+    the dict pydantic would dump for it, with keys in schema order. With
+    ``fields``, only those fields are read and written.
+
+    The function is generated as source, so a call is one dict display
+    with no per-field loop; nested schemas get serializers of their own,
+    which rules out schemas that contain themselves.
+    """
+    namespace, items = {}, []
+    for position, (name, field) in enumerate(schema.model_fields.items()):
+        if fields is not None and name not in fields:
+            continue
+        key = field.serialization_alias or field.alias or name
+        value = f"obj.{name}"
+        model, is_list, optional = _nested_model(field.annotation)
+        if model is not None:
+            helper = f"_nested_{position}"
+            namespace[helper] = serializer(model)
+            if is_list:
+                value = f"[{helper}(item) for item in {value}]"
+            else:
+                value = f"{helper}({value})"
+            if optional:
+                value = f"(None if obj.{name} is None else {value})"
+        items.append(f"{key!r}: {value}")
+
+    source = f"def serialize(obj):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f"<serializer {schema.__name__}>", "exec"), namespace)
+    return namespace["serialize"]
+
+def render(schema: Type[BaseModel], obj) -> bytes:
+    """``obj`` as ``schema`` JSON: compiled with FAST_JSON, otherwise through pydantic."""
+    if FAST_JSON:
+        return dumps(serializer(schema)(obj))
+    return schema.model_validate(obj, from_attributes=True).model_dump_json().encode()
+
+def json_response(data, headers: Optional[dict] = None) -> Response:
+    return Response(content=dumps(data), headers=dict(headers or {}), media_type="application/json")
@@ -0,0 +1,136 @@
+"""
+Application start-up and shutdown.
+
+Importing the app does no I/O: tables are created (DB_CREATE_TABLES) and
+pool connections opened (DB_POOL_PREWARM) by the lifespan handler once the
+server starts, and the slow imports of the auth path (jose, passlib) wait
+until the first request that needs them. Where start-up time goes can be
+seen with:
+
+    python main.py --profile-startup
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI
+from sqlalchemy import inspect
+from app.database import Base, async_engine, replica_router
+from app.passwords import password_hasher
+from app.pooling import prewarm
+
+logger = logging.getLogger("app.startup")
+
+# Creates missing tables; a new database is stamped at the latest migration
+# (see create_tables), so alembic upgrade head works on it afterwards
+CREATE_TABLES = os.getenv("DB_CREATE_TABLES", "true").lower() in ("1", "true", "yes", "on")
+# Connections opened per engine before the first request
+POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "0"))
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def create_tables(connection):
+    """
+    create_all() on ``connection``. create_all() builds the schema the
+    migrations end at, so a database that had no tables is stamped at the
+    head revision; without the stamp alembic would replay the initial
+    revision on top of the tables and fail. A database that already had
+    tables is left to ``python db_manager.py migrate``.
+    """
+    new_database = not inspect(connection).get_table_names()
+    Base.metadata.create_all(connection)
+    if new_database and os.path.exists(ALEMBIC_INI):
+        from alembic.config import Config
+        from alembic.runtime.migration import MigrationContext
+        from alembic.script import ScriptDirectory
+        script = ScriptDirectory.from_config(Config(ALEMBIC_INI))
+        MigrationContext.configure(connection).stamp(script, "head")
+
+@contextmanager
+def _timed(timings: dict, step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = time.perf_counter() - start
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timings = {}
+    if CREATE_TABLES:
+        with _timed(timings, "create_tables"):
+            async with async_engine.begin() as connection:
+                await connection.run_sync(create_tables)
+    if POOL_PREWARM > 0:
+        with _timed(timings, "pool_prewarm"):
+            for engine in [async_engine, *replica_router.engines]:
+                await prewarm(engine, POOL_PREWARM)
+    app.state.startup_timings = timings
+    logger.info("Startup complete: %s", ", ".join(
+        f"{step} {seconds * 1000:.1f} ms" for step, seconds in timings.items()
+    ) or "nothing to do")
+
+    try:
+        yield
+    finally:
+        password_hasher.shutdown()
+        for engine in [async_engine, *replica_router.engines]:
+            await engine.dispose()
+
+def _import_times(module: str) -> list:
+    """(name, self seconds, cumulative seconds) for every module ``module`` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6))
+    return times
+
+def _first_party(module: str) -> bool:
+    return module in ("main", "app") or module.startswith("app.")
+
+def profile_startup(create_app, top: int = 15):
+    """Print import and initialization times for main.py and its ``create_app``."""
+    # Imports are timed in a fresh interpreter, where nothing is loaded yet
+    times = _import_times("main")
+    total = next(cumulative for name, _, cumulative in times if name == "main")
+    print(f"Importing main: {total * 1000:.1f} ms\n")
+
+    print("First-party modules (self / cumulative ms):")
+    for name, own, cumulative in sorted(times, key=lambda item: -item[2]):
+        if _first_party(name):
+            print(f"  {name:32s} {own * 1000:8.1f} {cumulative * 1000:8.1f}")
+
+    packages = defaultdict(float)
+    for name, own, _ in times:
+        if not _first_party(name):
+            packages[name.split(".")[0]] += own
+    print("\nSlowest third-party packages (ms, all their modules):")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {name:32s} {seconds * 1000:8.1f}")
+
+    start = time.perf_counter()
+    app = create_app()
+    print(f"\ncreate_app(): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    async def _start():
+        async with lifespan(app):
+            pass
+
+    start = time.perf_counter()
+    asyncio.run(_start())
+    print(f"Lifespan start-up and shutdown: {(time.perf_counter() - start) * 1000:.1f} ms")
+    for step, seconds in app.state.startup_timings.items():
+        print(f"  {step:32s} {seconds * 1000:8.1f}")
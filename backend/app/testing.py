@@ -0,0 +1,57 @@
+"""
+Helpers for exercising the API in tests.
+
+    with assert_no_lazy_loads():
+        client.get("/api/recipes/")
+
+fails if building or serializing a response lazily loaded a relationship,
+i.e. a router forgot to declare its loading strategy for something the
+response model reads.
+
+    with strict_queries(max_repeats=3):
+        client.get("/api/comments/recipe/1")
+
+makes any request that runs the same statement more than three times fail
+with RepeatedQueryError (an N+1 query).
+"""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.instrumentation import query_monitor, RepeatedQueryError
+
+class LazyLoadError(AssertionError):
+    pass
+
+@contextmanager
+def assert_no_lazy_loads():
+    lazy_loads = []
+
+    def record(orm_execute_state):
+        if not orm_execute_state.is_select:
+            return
+        state = orm_execute_state.lazy_loaded_from
+        if state is not None:
+            lazy_loads.append(f"{state.class_.__name__}(id={state.identity})")
+
+    event.listen(Session, "do_orm_execute", record)
+    try:
+        yield lazy_loads
+    finally:
+        event.remove(Session, "do_orm_execute", record)
+
+    if lazy_loads:
+        raise LazyLoadError(
+            f"{len(lazy_loads)} lazy relationship load(s): " + ", ".join(lazy_loads)
+        )
+
+@contextmanager
+def strict_queries(max_repeats: int = 1):
+    previous = (query_monitor.enabled, query_monitor.strict, query_monitor.repeat_threshold)
+    query_monitor.enabled = True
+    query_monitor.strict = True
+    query_monitor.repeat_threshold = max_repeats
+    try:
+        yield query_monitor
+    finally:
+        query_monitor.enabled, query_monitor.strict, query_monitor.repeat_threshold = previous
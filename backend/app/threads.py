@@ -0,0 +1,160 @@
+"""
+Threaded comment trees loaded with one recursive CTE.
+
+A page of top-level comments (or of the replies to one comment) is the
+anchor; the recursive term adds up to ``replies`` children per comment, down
+to ``max_depth`` levels. Each level fetches one child more than it returns
+so the tree knows where "load more replies" is needed, which keeps the
+number of rows bounded no matter how large the thread is.
+"""
+
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Integer, select, func, literal, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from app.models import Comment
+from app.pagination import encode_cursor, decode_cursor
+
+MAX_THREAD_DEPTH = 10
+MAX_REPLIES_PER_COMMENT = 50
+
+# ?sort= values and the column each orders by (highest first; ties by id)
+COMMENT_SORTS = {
+    "new": Comment.id,
+    "best": Comment.best_score,
+    "hot": Comment.hot_score,
+}
+
+def sort_order(sort: str):
+    column = COMMENT_SORTS[sort]
+    if column is Comment.id:
+        return (Comment.id.desc(),)
+    return (column.desc(), Comment.id.desc())
+
+def sort_cursor(comment: Comment, sort: str) -> str:
+    column = COMMENT_SORTS[sort]
+    if column is Comment.id:
+        return encode_cursor([comment.id])
+    return encode_cursor([getattr(comment, column.key), comment.id])
+
+def after_cursor(sort: str, cursor: str):
+    """Filter for the comments after ``cursor`` in ``sort`` order."""
+    column = COMMENT_SORTS[sort]
+    if column is Comment.id:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return Comment.id < last_id
+    last_key, last_id = decode_cursor(cursor, 2)
+    if not isinstance(last_key, (int, float)) or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return or_(column < last_key, and_(column == last_key, Comment.id < last_id))
+
+async def load_thread(
+    db: AsyncSession,
+    anchor_filter,
+    sort: Optional[str],
+    limit: int,
+    max_depth: int,
+    replies: int,
+    with_authors: bool = True
+) -> Tuple[List[dict], bool]:
+    """
+    Nested comment dicts for the page of comments matching ``anchor_filter``,
+    and whether more pages follow.
+
+    The page is ordered by ``sort`` (see COMMENT_SORTS), or oldest first
+    when it is None; replies are always oldest first. Every node carries
+    ``depth`` (relative to the page), ``reply_count`` and, when some of its
+    replies were left out, a ``replies_cursor`` for
+    GET /api/comments/{id}/replies. Authors are joined in unless
+    ``with_authors`` is false.
+    """
+    sort_key = COMMENT_SORTS[sort] if sort else Comment.id
+    page = (
+        select(Comment.id, sort_key.label("sort_key"))
+        .where(anchor_filter, Comment.is_active == True)
+        .order_by(*(sort_order(sort) if sort else (Comment.id.asc(),)))
+        .limit(limit + 1)
+        .subquery()
+    )
+    if sort:
+        page_order = (page.c.sort_key.desc(), page.c.id.desc())
+    else:
+        page_order = (page.c.id.asc(),)
+    tree = select(
+        page.c.id,
+        literal(0, Integer).label("depth"),
+        func.row_number().over(order_by=page_order).label("position"),
+    ).cte("comment_tree", recursive=True)
+
+    # Children of a node: the first replies + 1 of them, by id
+    child = aliased(Comment)
+    sibling = aliased(Comment)
+    first_siblings = (
+        select(sibling.id)
+        .where(sibling.parent_id == tree.c.id, sibling.is_active == True)
+        .order_by(sibling.id)
+        .limit(replies + 1)
+    )
+    tree = tree.union_all(
+        select(child.id, tree.c.depth + 1, tree.c.position)
+        .where(
+            child.parent_id == tree.c.id,
+            tree.c.depth < max_depth,
+            # The extra anchor row only signals another page; skip its replies
+            tree.c.position <= limit,
+            child.id.in_(first_siblings),
+        )
+    )
+
+    reply = aliased(Comment)
+    reply_count = (
+        select(func.count(reply.id))
+        .where(reply.parent_id == Comment.id, reply.is_active == True)
+        .correlate(Comment)
+        .scalar_subquery()
+    )
+    query = (
+        select(Comment, tree.c.depth, reply_count)
+        .join(tree, tree.c.id == Comment.id)
+        .order_by(tree.c.depth, tree.c.position, Comment.id)
+    )
+    if with_authors:
+        query = query.options(joinedload(Comment.author))
+    result = await db.execute(query)
+
+    nodes = {}
+    top_level = []
+    for comment, depth, count in result.all():
+        node = {
+            "comment": comment,
+            "depth": depth,
+            "reply_count": count,
+            "replies": [],
+            "replies_cursor": None,
+        }
+        nodes[comment.id] = node
+        if depth == 0:
+            top_level.append(node)
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id]["replies"].append(node)
+
+    for node in nodes.values():
+        children = node["replies"]
+        if len(children) > replies:
+            del children[replies:]
+            node["replies_cursor"] = encode_cursor([children[-1]["comment"].id])
+        elif node["reply_count"] > len(children):
+            # Depth limit reached: replies load from the start
+            node["replies_cursor"] = encode_cursor([children[-1]["comment"].id if children else 0])
+
+    has_more = len(top_level) > limit
+    return top_level[:limit], has_more
+
+def walk(nodes: List[dict]):
+    """Every comment in the trees ``nodes``, parents before their replies."""
+    for node in nodes:
+        yield node["comment"]
+        yield from walk(node["replies"])
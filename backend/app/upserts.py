@@ -0,0 +1,148 @@
+"""
+Single-statement writes for ratings and comment votes.
+
+Ratings are unique per (recipe_id, user_id) and votes per (comment_id,
+user_id), so rating again or changing a vote is one
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING instead of a lookup followed
+by an insert or an update. Double-clicks and retries cannot create a second
+row; the loser of the race simply updates the winner's.
+
+The callers shift the aggregates on the recipe or comment by the difference
+to the previous value, so every write also reports that value. The parent
+row is locked first, which runs the writes for one recipe's ratings (or one
+comment's votes) one at a time. On PostgreSQL the previous value then comes
+from a subquery in the RETURNING clause: it reads the table as of the start
+of the statement, which, with the lock held, is the latest committed state.
+SQLite has no row locks and evaluates that subquery after the change, so
+there the parent is "locked" with a no-op UPDATE, which takes the database
+write lock, and the previous value is read in that statement's RETURNING
+clause, after the lock is held.
+"""
+
+from typing import Optional, Tuple
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from app.models import Recipe, Rating, Comment, CommentVote
+
+def _is_postgresql(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+def _key_filter(model, parent_key: str, parent_id: int, user_id: int):
+    return (getattr(model, parent_key) == parent_id, model.user_id == user_id)
+
+async def _lock_parent(db: AsyncSession, parent, parent_id: int, previous=None):
+    """
+    Lock the parent row; None if it does not exist. On SQLite the row
+    also carries the ``previous`` query's value (see the module docstring).
+    """
+    if _is_postgresql(db):
+        query = select(parent.id).where(parent.id == parent_id).with_for_update()
+    else:
+        # A plain SELECT takes no lock (pysqlite only begins the transaction
+        # at the first write), so concurrent writers would all read the same
+        # previous value; updated_at is kept as is, this is not an edit
+        columns = [parent.id] if previous is None else [parent.id, previous.scalar_subquery()]
+        query = (
+            update(parent).where(parent.id == parent_id)
+            .values({parent.id: parent.id, parent.updated_at: parent.updated_at})
+            .returning(*columns)
+        )
+    result = await db.execute(query, execution_options={"synchronize_session": False})
+    return result.first()
+
+async def _upsert(db: AsyncSession, model, parent, parent_key: str, parent_id: int,
+                  user_id: int, column, value):
+    key = _key_filter(model, parent_key, parent_id, user_id)
+    row = await _lock_parent(db, parent, parent_id, select(column).where(*key))
+    if row is None:
+        return None
+
+    insert = pg_insert if _is_postgresql(db) else sqlite_insert
+    statement = insert(model).values({parent_key: parent_id, "user_id": user_id, column.key: value})
+    changes = {column.key: statement.excluded[column.key]}
+    if hasattr(model, "updated_at"):
+        changes["updated_at"] = func.now()
+    statement = statement.on_conflict_do_update(
+        index_elements=[parent_key, "user_id"], set_=changes
+    )
+
+    options = {"populate_existing": True}
+    if _is_postgresql(db):
+        before = aliased(model)
+        # RETURNING is not a correlation scope for SQLAlchemy, so the
+        # reference to the inserted row is spelled out
+        previous = (
+            select(getattr(before, column.key))
+            .where(before.id == literal_column(f"{model.__tablename__}.id"))
+            .scalar_subquery()
+        )
+        result = await db.execute(statement.returning(model, previous), execution_options=options)
+        return tuple(result.one())
+    result = await db.execute(statement.returning(model), execution_options=options)
+    return result.scalar_one(), row[1]
+
+async def _delete(db: AsyncSession, model, parent, parent_key: str, parent_id: int,
+                  user_id: int, column):
+    key = _key_filter(model, parent_key, parent_id, user_id)
+    if await _lock_parent(db, parent, parent_id) is None:
+        return None
+    result = await db.execute(
+        delete(model).where(*key).returning(column),
+        execution_options={"synchronize_session": False}
+    )
+    return result.scalar()
+
+async def upsert_rating(
+    db: AsyncSession, recipe_id: int, user_id: int, value: float
+) -> Optional[Tuple[Rating, Optional[float]]]:
+    """
+    Insert or replace a user's rating. Returns the row and the value it
+    replaced (None for a new rating), or None if the recipe does not exist.
+    """
+    return await _upsert(db, Rating, Recipe, "recipe_id", recipe_id, user_id, Rating.rating, value)
+
+async def delete_rating(db: AsyncSession, recipe_id: int, user_id: int) -> Optional[float]:
+    """Delete a user's rating and return its value, or None if there was none."""
+    return await _delete(db, Rating, Recipe, "recipe_id", recipe_id, user_id, Rating.rating)
+
+async def upsert_vote(
+    db: AsyncSession, comment_id: int, user_id: int, vote_type: str
+) -> Optional[Tuple[CommentVote, Optional[str]]]:
+    """upsert_rating() for comment votes."""
+    return await _upsert(
+        db, CommentVote, Comment, "comment_id", comment_id, user_id, CommentVote.vote_type, vote_type
+    )
+
+async def delete_vote(db: AsyncSession, comment_id: int, user_id: int) -> Optional[str]:
+    """delete_rating() for comment votes; returns the vote type."""
+    return await _delete(
+        db, CommentVote, Comment, "comment_id", comment_id, user_id, CommentVote.vote_type
+    )
+
+def remove_duplicates(db: Session) -> dict:
+    """
+    Keep only the newest rating per user and recipe and the newest vote per
+    user and comment, then create the unique indexes the upserts rely on.
+
+    For databases created before the indexes existed; run the reconcile
+    commands afterwards. Returns the number of rows deleted per table.
+    """
+    deleted = {}
+    for model, parent_key in ((Rating, "recipe_id"), (CommentVote, "comment_id")):
+        newest = (
+            select(func.max(model.id))
+            .group_by(getattr(model, parent_key), model.user_id)
+        )
+        result = db.execute(
+            delete(model).where(model.id.not_in(newest)),
+            execution_options={"synchronize_session": False}
+        )
+        deleted[model.__tablename__] = result.rowcount
+        for index in model.__table__.indexes:
+            if index.unique:
+                index.create(db.connection(), checkfirst=True)
+    db.commit()
+    return deleted
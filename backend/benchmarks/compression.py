@@ -0,0 +1,98 @@
+"""
+Compression benchmark.
+
+Renders the payloads of the hot read endpoints (see
+benchmarks/serialization.py) and compresses each with every available
+algorithm at a range of levels, reporting the compressed size and the CPU
+time to compress and decompress one response:
+
+    python -m benchmarks.compression --database-url sqlite:///./benchmark.db
+
+zstd and br are only measured when their packages (zstandard, brotli) are
+installed. With the response cache on, a cached response is compressed once
+per encoding and then served as stored, so for hot responses only the
+decompression column is paid per request; uncached responses pay both.
+"""
+
+import argparse
+import gzip
+import os
+import time
+
+LEVELS = {
+    "gzip": [1, 6, 9],
+    "br": [1, 4, 6, 11],
+    "zstd": [1, 3, 9, 19],
+}
+
+def _decompressors() -> dict:
+    decompressors = {"gzip": gzip.decompress}
+    try:
+        import brotli
+        decompressors["br"] = brotli.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        decompressors["zstd"] = lambda data: zstandard.ZstdDecompressor().decompress(data)
+    except ImportError:
+        pass
+    return decompressors
+
+def _time_per_call(function, data: bytes, iterations: int):
+    """(result, CPU milliseconds per call) of ``function(data)``."""
+    result = function(data)
+    start = time.process_time()
+    for _ in range(iterations):
+        function(data)
+    return result, (time.process_time() - start) * 1000 / iterations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark response compression")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db",
+                        help="database to read from (seeded if empty)")
+    parser.add_argument("--scale", type=float, default=1.0, help="generate_data.py scale when seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--page-size", type=int, default=100, help="recipes per list page")
+    parser.add_argument("--iterations", type=int, default=20, help="timed runs per algorithm and level")
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+    from benchmarks.endpoints import _prepare_database
+    from benchmarks.serialization import load_payloads
+    from app.compression import CODEC_FACTORIES
+    from app.database import SessionLocal
+
+    _prepare_database(args.scale, args.seed)
+    db = SessionLocal()
+    try:
+        bodies = {name.strip(): render() for name, (render, _) in load_payloads(db, args.page_size).items()}
+    finally:
+        db.close()
+
+    decompressors = _decompressors()
+    missing = [name for name in LEVELS if name not in decompressors]
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}\n")
+
+    for name, body in bodies.items():
+        print(f"{name}: {len(body)} bytes")
+        print(f"  {'algorithm':12s} {'bytes':>9s} {'ratio':>7s} {'compress':>12s} {'decompress':>12s}")
+        for algorithm, levels in LEVELS.items():
+            if algorithm not in decompressors:
+                continue
+            for level in levels:
+                compress = CODEC_FACTORIES[algorithm](level)
+                compressed, compress_ms = _time_per_call(compress, body, args.iterations)
+                restored, decompress_ms = _time_per_call(decompressors[algorithm], compressed, args.iterations)
+                if restored != body:
+                    raise SystemExit(f"{algorithm} level {level} did not round-trip {name}")
+                print(
+                    f"  {algorithm + ' ' + str(level):12s} {len(compressed):9d} "
+                    f"{len(body) / len(compressed):6.1f}x {compress_ms:9.3f} ms {decompress_ms:9.3f} ms"
+                )
+        print()
+
+if __name__ == "__main__":
+    main()
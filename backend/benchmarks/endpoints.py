@@ -0,0 +1,322 @@
+"""
+Endpoint benchmark suite.
+
+Boots main:app in-process against a local database, seeding it with
+generate_data.py at the requested scale if it is empty, then drives the key
+routes at a fixed concurrency and reports throughput, latency percentiles,
+CPU time, response size and SQL statements per request:
+
+    python -m benchmarks.endpoints --scale 5 --concurrency 16 --requests 2000 \\
+        --output results.json --baseline benchmarks/baseline.json
+
+Requests go through httpx's ASGI transport, so the numbers measure the
+application and database rather than the network stack. Results are saved
+as JSON; with --baseline every scenario is compared against a previous run
+and the exit status is 1 if any latency, throughput or query budget regressed.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Scenarios that must stay within a fixed number of SQL statements per
+# request, whatever the data looks like
+STATEMENT_BUDGETS = {
+    "recipes_list": 2,
+    "recipes_search": 2,
+    "recipe_detail": 1,
+    "recipe_comments": 2,
+    "recipe_thread": 2,
+    "recipe_ratings": 1,
+    "rate_recipe": 4,
+    "vote_comment": 6,
+}
+
+# Relative change tolerated before a scenario is flagged
+DEFAULT_THRESHOLD = 0.15
+
+_statements = contextvars.ContextVar("benchmark_statements", default=None)
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_scenarios(rng: random.Random, recipe_ids, comment_ids, tokens, requests: int) -> dict:
+    """
+    Pre-generate every request so runs are reproducible and the timed loop
+    does no work of its own. Recipe ids are ordered by popularity and picked
+    with a Zipf skew, like real traffic.
+    """
+    from generate_data import zipf_cum_weights
+
+    weights = zipf_cum_weights(len(recipe_ids), 1.1)
+    hot = lambda: rng.choices(recipe_ids, cum_weights=weights)[0]
+    terms = ["chocolate", "lemon tart", "vegan", "caramel cake", "cinnamon", "berry", "almond"]
+
+    def auth():
+        return {"Authorization": f"Bearer {rng.choice(tokens)}"}
+
+    return {
+        "recipes_list": [
+            ("GET", "/api/recipes/", {"params": {"limit": 20}}) for _ in range(requests)
+        ],
+        "recipes_search": [
+            ("GET", "/api/recipes/", {"params": {"search": rng.choice(terms), "limit": 20}})
+            for _ in range(requests)
+        ],
+        "recipe_detail": [
+            ("GET", f"/api/recipes/{hot()}", {}) for _ in range(requests)
+        ],
+        "recipe_comments": [
+            ("GET", f"/api/comments/recipe/{hot()}", {}) for _ in range(requests)
+        ],
+        "recipe_thread": [
+            ("GET", f"/api/comments/recipe/{hot()}/thread", {}) for _ in range(requests)
+        ],
+        "recipe_ratings": [
+            ("GET", f"/api/ratings/recipe/{hot()}", {}) for _ in range(requests)
+        ],
+        "rate_recipe": [
+            ("POST", "/api/ratings/", {
+                "json": {"recipe_id": hot(), "rating": rng.choice([3.0, 4.0, 4.5, 5.0])},
+                "headers": auth(),
+            })
+            for _ in range(requests)
+        ],
+        "vote_comment": [
+            ("POST", f"/api/comments/{rng.choice(comment_ids)}/vote", {
+                "json": {"vote_type": "up" if rng.random() < 0.8 else "down"},
+                "headers": auth(),
+            })
+            for _ in range(requests)
+        ],
+    }
+
+async def run_scenario(client, plan, concurrency: int, warmup: int) -> dict:
+    for method, url, kwargs in plan[:warmup]:
+        await client.request(method, url, **kwargs)
+
+    latencies, statements, sizes = [], [], []
+    errors = 0
+    queue = iter(plan)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            counter = [0]
+            token = _statements.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            finally:
+                _statements.reset(token)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statements.append(counter[0])
+            # As sent, before the client decompresses it
+            sizes.append(response.num_bytes_downloaded)
+            if response.status_code >= 400:
+                errors += 1
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        # Everything runs in this process, so this includes httpx (and SQLite)
+        "cpu_ms_per_request": round(cpu * 1000 / len(latencies), 3),
+        "bytes_per_response": round(statistics.fmean(sizes)),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "statements_per_request": {
+            "mean": round(statistics.fmean(statements), 2),
+            "max": max(statements),
+        },
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        budget = STATEMENT_BUDGETS.get(name)
+        if budget is not None and current["statements_per_request"]["max"] > budget:
+            regressions.append(
+                f"{name}: {current['statements_per_request']['max']} statements per request "
+                f"exceeds budget of {budget}"
+            )
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {current['latency_ms']['p95']} ms vs {previous['latency_ms']['p95']} ms"
+            )
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {current['throughput_rps']} req/s vs {previous['throughput_rps']} req/s"
+            )
+        if current["statements_per_request"]["mean"] > previous["statements_per_request"]["mean"] + 0.1:
+            regressions.append(
+                f"{name}: {current['statements_per_request']['mean']} statements per request "
+                f"vs {previous['statements_per_request']['mean']}"
+            )
+    return regressions
+
+def _prepare_database(scale: float, seed: int):
+    from sqlalchemy import select
+    from app.database import SessionLocal, engine
+    from app.models import Base, User, Recipe, Comment
+    import generate_data
+
+    # The app only creates tables in its lifespan, which ASGITransport skips
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(User).count() == 0:
+            print(f"Seeding benchmark database at scale {scale}...")
+            generate_data.main(["--scale", str(scale), "--seed", str(seed)])
+        recipe_ids = db.scalars(
+            select(Recipe.id).where(Recipe.is_published == True)
+            .order_by(Recipe.rating_count.desc(), Recipe.id).limit(10000)
+        ).all()
+        comment_ids = db.scalars(select(Comment.id).order_by(Comment.id).limit(10000)).all()
+        users = db.execute(
+            select(User.id, User.username).where(User.is_active == True).order_by(User.id).limit(200)
+        ).all()
+    finally:
+        db.close()
+    return recipe_ids, comment_ids, users
+
+async def run(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+    from app.auth import create_access_token
+    from app.database import async_engine, replica_router
+    from main import app
+
+    recipe_ids, comment_ids, users = _prepare_database(args.scale, args.seed)
+    if not recipe_ids or not comment_ids or not users:
+        raise SystemExit("Benchmark database has no recipes, comments or users")
+    tokens = [
+        create_access_token({"sub": username, "uid": user_id, "active": True})
+        for user_id, username in users
+    ]
+
+    for target in [async_engine, *replica_router.engines]:
+        event.listen(target.sync_engine, "before_cursor_execute", _count_statement)
+
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(rng, recipe_ids, comment_ids, tokens, args.requests)
+    selected = args.scenario or list(scenarios)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "database": async_engine.dialect.name,
+            "scale": args.scale,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "accept_encoding": args.accept_encoding,
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Accept-Encoding": args.accept_encoding}
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", headers=headers) as client:
+        for name in selected:
+            stats = await run_scenario(client, scenarios[name], args.concurrency, args.warmup)
+            results["scenarios"][name] = stats
+            print(
+                f"{name:16s} {stats['throughput_rps']:8.1f} req/s  "
+                f"p50 {stats['latency_ms']['p50']:7.2f}  p95 {stats['latency_ms']['p95']:7.2f}  "
+                f"p99 {stats['latency_ms']['p99']:7.2f} ms  "
+                f"cpu {stats['cpu_ms_per_request']:6.2f} ms/req  "
+                f"{stats['bytes_per_response']:8d} B/resp  "
+                f"{stats['statements_per_request']['mean']:5.2f} stmts/req  "
+                f"{stats['errors']} errors"
+            )
+    await async_engine.dispose()
+    return results
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the main API endpoints")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db",
+                        help="database to benchmark against (seeded if empty)")
+    parser.add_argument("--scale", type=float, default=1.0, help="generate_data.py scale when seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(STATEMENT_BUDGETS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--accept-encoding", default="identity",
+                        help="Accept-Encoding sent with every request, e.g. gzip or zstd")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write results")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative latency/throughput change flagged as a regression")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Must be set before anything imports app.database
+    os.environ["DATABASE_URL"] = args.database_url
+    # Tokens are minted directly, so logins never hit the hashing pool
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    baseline = {"scenarios": {}}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\n❌ Regressions:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("✅ No regressions" + (f" against {args.baseline}" if args.baseline else ""))
+
+if __name__ == "__main__":
+    main()
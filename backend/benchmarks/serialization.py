@@ -0,0 +1,147 @@
+"""
+Serialization benchmark.
+
+Loads the rows behind the hot read endpoints from a local database (seeded
+like benchmarks/endpoints.py) and measures the CPU time it takes to turn
+them into a response body, before and after FAST_JSON:
+
+- pydantic: the default path. Cached routes validate and dump with
+  model_dump_json; the comment list goes through FastAPI's response_model
+  handling (validate, dump to JSON-compatible Python, json.dumps).
+- fast: app.serializers' compiled serializer and orjson.
+
+    python -m benchmarks.serialization --database-url sqlite:///./benchmark.db --iterations 200
+
+Both bodies are decoded and compared for every payload, so the run also
+checks that the fast path returns what the schema would.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+def _time_per_call(function, iterations: int) -> float:
+    """CPU milliseconds per call of ``function``."""
+    function()
+    start = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - start) * 1000 / iterations
+
+def load_payloads(db, page_size: int) -> dict:
+    """Name -> (pydantic, fast) functions rendering the payloads of the hot endpoints."""
+    from sqlalchemy import select, func
+    from sqlalchemy.orm import joinedload
+    from app.models import Recipe, Comment
+    from app.projections import RecipePage, RECIPE_PROJECTIONS, parse_fields, render_page
+    from app.authors import authors_dict
+    from app.schemas import (
+        Recipe as RecipeSchema, Comment as CommentSchema, NormalizedComment, NormalizedCommentList
+    )
+    from app.serializers import serializer, dumps
+
+    recipes = db.scalars(
+        select(Recipe).options(joinedload(Recipe.author))
+        .where(Recipe.is_published == True).order_by(Recipe.id.desc()).limit(page_size)
+    ).all()
+    busiest = db.scalar(
+        select(Comment.recipe_id).where(Comment.is_active == True)
+        .group_by(Comment.recipe_id).order_by(func.count().desc()).limit(1)
+    )
+    comments = db.scalars(
+        select(Comment).options(joinedload(Comment.author))
+        .where(Comment.recipe_id == busiest, Comment.is_active == True).order_by(Comment.id)
+    ).all()
+    page = RecipePage(recipes=recipes, total=None, next_cursor=None)
+    payloads = {}
+    for projection in RECIPE_PROJECTIONS:
+        fields = parse_fields(projection)
+        payloads[f"recipes_page {projection} ({len(recipes)})"] = (
+            lambda fields=fields: render_page(page, fields, fast=False),
+            lambda fields=fields: render_page(page, fields, fast=True),
+        )
+    payloads["recipe_detail"] = renderers(RecipeSchema, recipes[0])
+    payloads[f"recipe_comments ({len(comments)})"] = renderers(List[CommentSchema], comments)
+
+    # ?normalized=true: each author once, in a top-level map
+    authors = dict(sorted((comment.author_id, comment.author) for comment in comments))
+    serialize = serializer(NormalizedComment)
+    payloads[f"  normalized ({len(authors)} authors)"] = (
+        lambda: NormalizedCommentList(comments=comments, authors=authors).model_dump_json().encode(),
+        lambda: dumps({
+            "comments": [serialize(comment) for comment in comments],
+            "authors": authors_dict(authors),
+        }),
+    )
+    return payloads
+
+def renderers(schema, rows):
+    """(pydantic, fast) functions returning the body for ``rows``."""
+    from pydantic import TypeAdapter
+    from app.serializers import serializer, dumps
+
+    if isinstance(schema, type):
+        serialize = serializer(schema)
+        return (
+            lambda: schema.model_validate(rows, from_attributes=True).model_dump_json().encode(),
+            lambda: dumps(serialize(rows)),
+        )
+
+    # A list response model, as FastAPI renders it
+    adapter = TypeAdapter(schema)
+    serialize = serializer(schema.__args__[0])
+
+    def pydantic_path():
+        value = adapter.validate_python(rows, from_attributes=True)
+        content = adapter.dump_python(value, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    return pydantic_path, lambda: dumps([serialize(row) for row in rows])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db",
+                        help="database to read from (seeded if empty)")
+    parser.add_argument("--scale", type=float, default=1.0, help="generate_data.py scale when seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--page-size", type=int, default=100, help="recipes per list page")
+    parser.add_argument("--iterations", type=int, default=200, help="timed renders per payload")
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+    from benchmarks.endpoints import _prepare_database
+    from app.database import SessionLocal
+    from app import serializers
+
+    _prepare_database(args.scale, args.seed)
+    db = SessionLocal()
+    try:
+        payloads = load_payloads(db, args.page_size)
+    finally:
+        db.close()
+
+    encoder = "orjson" if serializers.orjson is not None else "json (orjson not installed)"
+    print(f"Fast path encoder: {encoder}\n")
+    print(f"{'payload':30s} {'bytes':>9s} {'pydantic':>12s} {'fast':>12s} {'speedup':>8s}")
+    mismatched = []
+    for name, (slow, fast) in payloads.items():
+        body = slow()
+        if json.loads(body) != json.loads(fast()):
+            mismatched.append(name)
+        before = _time_per_call(slow, args.iterations)
+        after = _time_per_call(fast, args.iterations)
+        print(
+            f"{name:30s} {len(body):9d} {before:9.3f} ms {after:9.3f} ms {before / after:7.1f}x"
+        )
+
+    if mismatched:
+        print(f"\n❌ Fast path output differs for: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("\n✅ Fast path output matches the schemas")
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,26 @@ Commands:
   clear_data    - Clear all data from tables
   reset         - Drop and recreate all tables with sample data
   status        - Show database status
+  reconcile_ratings - Backfill/repair the rating aggregates stored on recipes
+  reconcile_votes   - Backfill/repair the vote tallies stored on comments
+  rebuild_search    - Create/repopulate the full-text recipe search index
+  dedupe            - Drop duplicate ratings/votes and add their unique indexes
+  migrate           - Apply the Alembic migrations (alembic upgrade head)
+  generate [options] - Append a large synthetic dataset for load testing
+                       (see python generate_data.py --help)
 """
 
+import os
 import sys
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-from app.database import engine, get_db
+from app.database import engine, SessionLocal
 from app.models import Base, User, Recipe, Comment, Rating, CommentVote
+from app.aggregates import reconcile_rating_aggregates, reconcile_vote_counts
+from app.search import rebuild_search_index
+from app.upserts import remove_duplicates
+from app import startup
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -25,12 +38,31 @@ def hash_password(password: str) -> str:
 def create_tables():
     """Create all database tables."""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        startup.create_tables(connection)
     print("✅ Tables created successfully!")
 
+def migrate():
+    """Apply the Alembic migrations in migrations/versions."""
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    try:
+        tables = inspect(engine).get_table_names()
+        if tables and "alembic_version" not in tables:
+            # Created by create_all(), which covers at least the initial
+            # revision; the later ones only add what such a database lacks
+            print("Database has no migration history; stamping it at 0001...")
+            command.stamp(config, "0001")
+        print("Applying migrations...")
+        command.upgrade(config, "head")
+        print("✅ Database schema is up to date")
+    except Exception as e:
+        print(f"❌ Error applying migrations: {e}")
+
 def clear_data():
     """Clear all data from tables."""
-    db = next(get_db())
+    db = SessionLocal()
     try:
         print("Clearing all data...")
         db.query(CommentVote).delete()
@@ -55,7 +87,7 @@ def reset_database():
 
 def show_status():
     """Show current database status."""
-    db = next(get_db())
+    db = SessionLocal()
     try:
         user_count = db.query(User).count()
         recipe_count = db.query(Recipe).count()
@@ -81,9 +113,64 @@ def show_status():
     finally:
         db.close()
 
+def reconcile_ratings():
+    """Recompute the rating aggregates stored on each recipe."""
+    db = SessionLocal()
+    try:
+        print("Reconciling recipe rating aggregates...")
+        changed = reconcile_rating_aggregates(db)
+        print(f"✅ Rating aggregates reconciled ({changed} recipes updated)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconciling ratings: {e}")
+    finally:
+        db.close()
+
+def reconcile_votes():
+    """Recompute the vote tallies stored on each comment."""
+    db = SessionLocal()
+    try:
+        print("Reconciling comment vote tallies...")
+        changed = reconcile_vote_counts(db)
+        print(f"✅ Vote tallies reconciled ({changed} comments updated)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconciling votes: {e}")
+    finally:
+        db.close()
+
+def rebuild_search():
+    """Create the search index if missing and reindex every recipe."""
+    db = SessionLocal()
+    try:
+        print("Rebuilding recipe search index...")
+        count = rebuild_search_index(db)
+        print(f"✅ Search index rebuilt ({count} recipes)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding search index: {e}")
+    finally:
+        db.close()
+
+def dedupe():
+    """Keep one rating per user and recipe and one vote per user and comment."""
+    db = SessionLocal()
+    try:
+        print("Removing duplicate ratings and votes...")
+        deleted = remove_duplicates(db)
+        print(f"✅ Removed {deleted['ratings']} ratings and {deleted['comment_votes']} votes")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error removing duplicates: {e}")
+        return
+    finally:
+        db.close()
+    reconcile_ratings()
+    reconcile_votes()
+
 def seed_basic():
     """Add basic test data."""
-    db = next(get_db())
+    db = SessionLocal()
     try:
         if db.query(User).count() > 0:
             print("Data already exists. Use 'clear_data' first if you want to reset.")
@@ -116,6 +203,7 @@ def seed_basic():
         for recipe in recipes:
             db.add(recipe)
         db.commit()
+        rebuild_search_index(db)
         
         # Create comments
         comments = [
@@ -137,10 +225,10 @@ def seed_basic():
         db.close()
 
 def main():
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2 or (len(sys.argv) > 2 and sys.argv[1] != "generate"):
         print(__doc__)
         return
-    
+
     command = sys.argv[1]
     
     if command == "create_tables":
@@ -157,6 +245,19 @@ def main():
         reset_database()
     elif command == "status":
         show_status()
+    elif command == "reconcile_ratings":
+        reconcile_ratings()
+    elif command == "reconcile_votes":
+        reconcile_votes()
+    elif command == "rebuild_search":
+        rebuild_search()
+    elif command == "dedupe":
+        dedupe()
+    elif command == "migrate":
+        migrate()
+    elif command == "generate":
+        import generate_data
+        generate_data.main(sys.argv[2:])
     else:
         print(f"Unknown command: {command}")
         print(__doc__)
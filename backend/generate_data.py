@@ -0,0 +1,355 @@
+"""
+High-volume synthetic data generator for load testing.
+
+Produces users, recipes, comments, ratings and comment votes at production
+scale so query plans and endpoint timings can be reproduced locally:
+
+    python db_manager.py generate --scale 100 --seed 42
+
+Output is fully determined by --seed and the row counts. Popularity is
+Zipfian (a few prolific authors and a long tail of rarely rated recipes),
+comments form deep reply chains and vote counts are heavy-tailed. Rows are
+written with COPY on PostgreSQL and batched executemany elsewhere; every
+user shares one password, hashed once. Rating aggregates, vote tallies and
+comment scores are computed while generating, so no reconcile pass is
+needed afterwards.
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from sqlalchemy import func, select, text
+from app.database import engine, SessionLocal
+from app.models import Base, User, Recipe, Comment, Rating, CommentVote
+from app.aggregates import rating_bucket
+from app.passwords import get_context
+from app.ranking import wilson_lower_bound, hot_score
+from app.search import rebuild_search_index
+
+# Row counts per unit of --scale
+BASE_COUNTS = {
+    "users": 1000,
+    "recipes": 2000,
+    "comments": 20000,
+    "ratings": 50000,
+    "votes": 50000,
+}
+
+# Recipes are generated (with their comments, ratings and votes) in chunks
+CHUNK_SIZE = 2000
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+TIME_SPAN = timedelta(days=730)
+
+ADJECTIVES = ["Classic", "Easy", "Rustic", "Fluffy", "Chewy", "Decadent", "Light", "Spiced",
+              "Salted", "Brown Butter", "Vegan", "Gluten-Free", "Mini", "Double", "Toasted"]
+FLAVORS = ["Chocolate", "Vanilla", "Lemon", "Strawberry", "Caramel", "Pistachio", "Matcha",
+           "Coconut", "Raspberry", "Hazelnut", "Pumpkin", "Cinnamon", "Espresso", "Mango",
+           "Almond", "Blueberry", "Peanut Butter", "Cherry", "Honey", "Orange"]
+DESSERTS = ["Cookies", "Cake", "Cheesecake", "Brownies", "Tart", "Pie", "Muffins", "Cupcakes",
+            "Macarons", "Pudding", "Mousse", "Bars", "Scones", "Donuts", "Ice Cream", "Crumble"]
+INGREDIENTS = ["all-purpose flour", "granulated sugar", "brown sugar", "unsalted butter",
+               "eggs", "whole milk", "heavy cream", "vanilla extract", "baking soda",
+               "baking powder", "salt", "cocoa powder", "dark chocolate", "cream cheese",
+               "lemon zest", "ground cinnamon", "almond flour", "honey", "powdered sugar",
+               "sour cream", "buttermilk", "cornstarch", "espresso powder", "fresh berries"]
+STEPS = ["Preheat the oven to 350°F (175°C).", "Whisk the dry ingredients together.",
+         "Cream the butter and sugar until fluffy.", "Beat in the eggs one at a time.",
+         "Fold in the flour mixture until just combined.", "Pour the batter into the pan.",
+         "Bake until golden and a skewer comes out clean.", "Chill for at least two hours.",
+         "Let cool completely before slicing.", "Dust with powdered sugar and serve."]
+COMMENT_PHRASES = ["Made this last weekend and it was a hit.", "Too sweet for my taste.",
+                   "I halved the sugar and it was perfect.", "Does this freeze well?",
+                   "Mine came out a little dry, any tips?", "Agreed!", "Great question.",
+                   "Try baking it five minutes less.", "My kids loved it.",
+                   "Used gluten-free flour with no problems.", "Not sure that's right.",
+                   "This is the best version I've tried.", "Thanks, that worked!"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+def zipf_cum_weights(n: int, exponent: float):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices()."""
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+def stochastic_round(rng: random.Random, value: float) -> int:
+    whole = int(value)
+    return whole + (rng.random() < value - whole)
+
+def _timestamp(rng: random.Random, after: datetime = EPOCH) -> datetime:
+    remaining = (EPOCH + TIME_SPAN - after).total_seconds()
+    return after + timedelta(seconds=int(rng.random() * max(remaining, 0)))
+
+class BulkWriter:
+    """Appends rows to a table with COPY on PostgreSQL, executemany elsewhere."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+
+    def write(self, table, columns, rows):
+        if not rows:
+            return
+        if self.dialect == "postgresql":
+            self._copy(table, columns, rows)
+        else:
+            self.connection.execute(
+                table.insert(), [dict(zip(columns, row)) for row in rows]
+            )
+
+    def _copy(self, table, columns, rows):
+        statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = self.connection.connection.dbapi_connection.cursor()
+        try:
+            if hasattr(cursor, "copy"):
+                # psycopg 3
+                with cursor.copy(statement) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                # psycopg2
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(["" if value is None else value for value in row])
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+        finally:
+            cursor.close()
+
+def _next_id(connection, model) -> int:
+    return connection.execute(select(func.coalesce(func.max(model.id), 0))).scalar() + 1
+
+def _reset_sequences(connection):
+    for model in (User, Recipe, Comment, Rating, CommentVote):
+        table = model.__tablename__
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT coalesce(max(id), 1) FROM {table}))"
+        ))
+
+USER_COLUMNS = ["id", "username", "email", "hashed_password", "full_name", "is_active", "created_at"]
+RECIPE_COLUMNS = [
+    "id", "title", "description", "ingredients", "instructions", "prep_time", "cook_time",
+    "servings", "difficulty", "image_url", "author_id", "is_published", "created_at",
+    "rating_sum", "rating_count", "rating_1_count", "rating_2_count", "rating_3_count",
+    "rating_4_count", "rating_5_count", "ratings_updated_at", "comments_version",
+    "comments_updated_at",
+]
+COMMENT_COLUMNS = [
+    "id", "content", "recipe_id", "author_id", "parent_id", "is_active", "created_at",
+    "upvotes", "downvotes", "best_score", "hot_score",
+]
+RATING_COLUMNS = ["id", "rating", "recipe_id", "user_id", "created_at"]
+VOTE_COLUMNS = ["id", "vote_type", "comment_id", "user_id", "created_at"]
+
+def generate(
+    users: int,
+    recipes: int,
+    comments: int,
+    ratings: int,
+    votes: int,
+    seed: int = 42,
+    zipf: float = 1.1,
+    reply_ratio: float = 0.6,
+    max_depth: int = 40,
+    password: str = "password123",
+) -> dict:
+    """
+    Append a synthetic dataset to the database and return the row counts.
+
+    ``comments``, ``ratings`` and ``votes`` are targets: they are spread
+    over recipes by popularity, so the totals written land close to but not
+    exactly on them. Ratings are capped at one per user per recipe and
+    votes at one per user per comment.
+    """
+    rng = random.Random(seed)
+    shared_hash = get_context().hash(password)
+    written = dict.fromkeys(BASE_COUNTS, 0)
+
+    with engine.begin() as connection:
+        writer = BulkWriter(connection)
+        if writer.dialect == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        user_start = _next_id(connection, User)
+        recipe_start = _next_id(connection, Recipe)
+        comment_id = _next_id(connection, Comment)
+        rating_id = _next_id(connection, Rating)
+        vote_id = _next_id(connection, CommentVote)
+
+        # Users, oldest first so ids follow signup order
+        user_ids = range(user_start, user_start + users)
+        user_created = sorted(_timestamp(rng) for _ in user_ids)
+        for offset in range(0, users, CHUNK_SIZE * 5):
+            rows = [
+                (
+                    user_id,
+                    f"gen_user_{user_id}",
+                    f"gen_user_{user_id}@example.com",
+                    shared_hash,
+                    f"Generated User {user_id}",
+                    rng.random() > 0.02,
+                    user_created[user_id - user_start],
+                )
+                for user_id in user_ids[offset:offset + CHUNK_SIZE * 5]
+            ]
+            writer.write(User.__table__, USER_COLUMNS, rows)
+            written["users"] += len(rows)
+        print(f"Created {written['users']} users")
+
+        # Popularity ranks are shuffled so they do not follow id order
+        active_users = list(user_ids)
+        rng.shuffle(active_users)
+        user_weights = zipf_cum_weights(users, zipf)
+        recipe_ranks = list(range(1, recipes + 1))
+        rng.shuffle(recipe_ranks)
+        harmonic = sum(1.0 / (rank ** zipf) for rank in range(1, recipes + 1))
+        votes_per_comment = votes / comments if comments else 0.0
+
+        for offset in range(0, recipes, CHUNK_SIZE):
+            recipe_rows, comment_rows, rating_rows, vote_rows = [], [], [], []
+            for index in range(offset, min(offset + CHUNK_SIZE, recipes)):
+                recipe_id = recipe_start + index
+                share = 1.0 / (recipe_ranks[index] ** zipf) / harmonic
+                author_id = rng.choices(active_users, cum_weights=user_weights)[0]
+                created_at = _timestamp(rng)
+
+                # Ratings skew high, like real recipe sites
+                aggregates = [0.0, 0] + [0] * 5
+                rated_at = None
+                raters = rng.sample(user_ids, min(stochastic_round(rng, ratings * share), users))
+                for user_id in raters:
+                    value = round(min(5.0, max(1.0, rng.gauss(4.2, 0.9))), 1)
+                    aggregates[0] += value
+                    aggregates[1] += 1
+                    aggregates[1 + rating_bucket(value)] += 1
+                    timestamp = _timestamp(rng, created_at)
+                    rated_at = max(rated_at or timestamp, timestamp)
+                    rating_rows.append((rating_id, value, recipe_id, user_id, timestamp))
+                    rating_id += 1
+
+                # Comment threads: replies mostly continue the latest branch
+                depths = {}
+                thread = []
+                comment_time = created_at
+                for _ in range(stochastic_round(rng, comments * share)):
+                    parent_id = None
+                    if thread and rng.random() < reply_ratio:
+                        parent_id = thread[-1] if rng.random() < 0.7 else rng.choice(thread)
+                        if depths[parent_id] >= max_depth:
+                            parent_id = None
+                    depths[comment_id] = depths[parent_id] + 1 if parent_id else 0
+                    comment_time += timedelta(minutes=rng.randint(1, 600))
+                    voters = rng.sample(user_ids, min(
+                        stochastic_round(rng, votes_per_comment * rng.paretovariate(1.5) / 3), users
+                    ))
+                    tally = {"up": 0, "down": 0}
+                    for user_id in voters:
+                        vote_type = "up" if rng.random() < 0.8 else "down"
+                        tally[vote_type] += 1
+                        vote_rows.append((vote_id, vote_type, comment_id, user_id, comment_time))
+                        vote_id += 1
+                    comment_rows.append((
+                        comment_id,
+                        " ".join(rng.choices(COMMENT_PHRASES, k=rng.randint(1, 4))),
+                        recipe_id,
+                        rng.choices(active_users, cum_weights=user_weights)[0],
+                        parent_id,
+                        True,
+                        comment_time,
+                        tally["up"],
+                        tally["down"],
+                        wilson_lower_bound(tally["up"], tally["down"]),
+                        hot_score(tally["up"], tally["down"], comment_time),
+                    ))
+                    thread.append(comment_id)
+                    comment_id += 1
+
+                flavor = rng.choice(FLAVORS)
+                dessert = rng.choice(DESSERTS)
+                recipe_rows.append((
+                    recipe_id,
+                    f"{rng.choice(ADJECTIVES)} {flavor} {dessert}",
+                    f"A {rng.choice(DIFFICULTIES)} {flavor.lower()} {dessert.lower()} recipe "
+                    f"for {rng.choice(['weekends', 'parties', 'holidays', 'beginners', 'two'])}.",
+                    "\n".join(rng.sample(INGREDIENTS, rng.randint(5, 12))),
+                    "\n".join(
+                        f"{step}. {instruction}"
+                        for step, instruction in enumerate(rng.sample(STEPS, rng.randint(4, 8)), 1)
+                    ),
+                    rng.choice([5, 10, 15, 20, 30, 45]),
+                    rng.choice([0, 10, 15, 25, 35, 50, 60]),
+                    rng.choice([4, 6, 8, 12, 16, 24]),
+                    rng.choice(DIFFICULTIES),
+                    None,
+                    author_id,
+                    rng.random() > 0.05,
+                    created_at,
+                    *aggregates,
+                    rated_at,
+                    len(thread),
+                    comment_time if thread else None,
+                ))
+
+            # Parents before children for the foreign keys
+            writer.write(Recipe.__table__, RECIPE_COLUMNS, recipe_rows)
+            writer.write(Comment.__table__, COMMENT_COLUMNS, comment_rows)
+            writer.write(Rating.__table__, RATING_COLUMNS, rating_rows)
+            writer.write(CommentVote.__table__, VOTE_COLUMNS, vote_rows)
+            written["recipes"] += len(recipe_rows)
+            written["comments"] += len(comment_rows)
+            written["ratings"] += len(rating_rows)
+            written["votes"] += len(vote_rows)
+            print(f"  {written['recipes']}/{recipes} recipes...")
+
+        if writer.dialect == "postgresql":
+            _reset_sequences(connection)
+
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+    finally:
+        db.close()
+    return written
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplier for the default row counts (%s)" %
+                        ", ".join(f"{name}={count}" for name, count in BASE_COUNTS.items()))
+    for name in BASE_COUNTS:
+        parser.add_argument(f"--{name}", type=int, help=f"exact number of {name} (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; same seed, same data")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew exponent")
+    parser.add_argument("--reply-ratio", type=float, default=0.6,
+                        help="fraction of comments that are replies")
+    parser.add_argument("--max-depth", type=int, default=40, help="deepest reply nesting")
+    parser.add_argument("--password", default="password123", help="password shared by all users")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    counts = {
+        name: getattr(args, name) if getattr(args, name) is not None else int(base * args.scale)
+        for name, base in BASE_COUNTS.items()
+    }
+    Base.metadata.create_all(bind=engine)
+    print(f"Generating data (seed={args.seed}): " +
+          ", ".join(f"{count} {name}" for name, count in counts.items()))
+    start = time.perf_counter()
+    written = generate(
+        **counts,
+        seed=args.seed,
+        zipf=args.zipf,
+        reply_ratio=args.reply_ratio,
+        max_depth=args.max_depth,
+        password=args.password,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"✅ Generated in {elapsed:.1f}s: " +
+          ", ".join(f"{count} {name}" for name, count in written.items()))
+    print(f"All generated users log in with password '{args.password}'")
+
+if __name__ == "__main__":
+    main()
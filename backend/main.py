@@ -1,48 +1,86 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import argparse
+from fastapi import APIRouter, FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-import uvicorn
-
-from app.database import get_db, engine
-from app.models import Base
-from app.routers import auth, recipes, comments, ratings
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="CecilioSweets API",
-    description="A dessert recipe platform API with user authentication, ratings, and comments",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    # allow_origins=["http://localhost:4200"],  # React dev server
-    allow_origins=["*"],  # React dev server
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, pool_stats
+from app.instrumentation import QueryStatsMiddleware
+from app.compression import CompressionMiddleware
+from app.response_cache import response_cache
+from app.startup import lifespan
 
 # Security
 security = HTTPBearer()
 
-# Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
-app.include_router(recipes.router, prefix="/api/recipes", tags=["recipes"])
-app.include_router(comments.router, prefix="/api/comments", tags=["comments"])
-app.include_router(ratings.router, prefix="/api/ratings", tags=["ratings"])
+router = APIRouter()
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "Welcome to CecilioSweets API"}
 
-@app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+@router.get("/health")
+async def health_check(db: AsyncSession = Depends(get_db)):
     return {"status": "healthy", "database": "connected"}
 
+@router.get("/health/pool")
+async def pool_health():
+    return {name: stats.snapshot() for name, stats in pool_stats.items()}
+
+@router.get("/health/cache")
+async def cache_health():
+    return {"responses": response_cache.stats()}
+
+def create_app() -> FastAPI:
+    """
+    Build the API. Nothing touches the database here; tables and pool
+    connections are set up by app.startup.lifespan when the server starts.
+    """
+    from app.routers import auth, recipes, comments, ratings
+
+    app = FastAPI(
+        title="CecilioSweets API",
+        description="A dessert recipe platform API with user authentication, ratings, and comments",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        # allow_origins=["http://localhost:4200"],  # React dev server
+        allow_origins=["*"],  # React dev server
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # gzip/br/zstd as the client accepts; inside the stats middleware so its
+    # cost shows up in Server-Timing
+    app.add_middleware(CompressionMiddleware)
+
+    # Statement counts and DB time per request (Server-Timing header + app.sql log)
+    app.add_middleware(QueryStatsMiddleware)
+
+    # Include routers
+    app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+    app.include_router(recipes.router, prefix="/api/recipes", tags=["recipes"])
+    app.include_router(comments.router, prefix="/api/comments", tags=["comments"])
+    app.include_router(ratings.router, prefix="/api/ratings", tags=["ratings"])
+    app.include_router(router)
+    return app
+
+# For `uvicorn main:app`; `uvicorn main:create_app --factory` builds its own
+app = create_app()
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the CecilioSweets API")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import and start-up time per module instead of serving")
+    args = parser.parse_args()
+    if args.profile_startup:
+        from app.startup import profile_startup
+        profile_startup(create_app)
+    else:
+        import uvicorn
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,62 @@
+"""
+Alembic environment for the CecilioSweets schema.
+
+Migrations run against DATABASE_URL with the synchronous driver, the same
+connection db_manager.py uses. The full-text search objects (the
+search_vector column on PostgreSQL, the recipes_fts table on SQLite) are
+created by raw DDL rather than declared on the models, so autogenerate is
+told to leave them alone.
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.database import DATABASE_URL
+from app.models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+SEARCH_OBJECTS = {"search_vector", "ix_recipes_search_vector"}
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        if name in SEARCH_OBJECTS or (name or "").startswith("recipes_fts"):
+            return False
+    return True
+
+def _url() -> str:
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+def run_migrations_offline():
+    context.configure(
+        url=_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=_url().startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    connectable = create_engine(_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite can only alter tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,107 @@
+"""initial schema
+
+The tables and indexes as created by Base.metadata.create_all() before
+migrations were introduced, i.e. before the rating aggregates, vote
+tallies, ranking scores, unique rating/vote keys and full-text search were
+added (later revisions add those). A database created that way is
+already at this revision:
+
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 18:53:12.377261
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('full_name', sa.String(length=100), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('recipes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('ingredients', sa.Text(), nullable=False),
+        sa.Column('instructions', sa.Text(), nullable=False),
+        sa.Column('prep_time', sa.Integer(), nullable=True),
+        sa.Column('cook_time', sa.Integer(), nullable=True),
+        sa.Column('servings', sa.Integer(), nullable=True),
+        sa.Column('difficulty', sa.String(length=20), nullable=True),
+        sa.Column('image_url', sa.String(length=500), nullable=True),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('is_published', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recipes_id', 'recipes', ['id'], unique=False)
+
+    op.create_table('comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['parent_id'], ['comments.id']),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_comments_id', 'comments', ['id'], unique=False)
+
+    op.create_table('ratings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Float(), nullable=False),
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ratings_id', 'ratings', ['id'], unique=False)
+
+    op.create_table('comment_votes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vote_type', sa.String(length=10), nullable=False),
+        sa.Column('comment_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['comment_id'], ['comments.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_comment_votes_id', 'comment_votes', ['id'], unique=False)
+
+def downgrade():
+    op.drop_table('comment_votes')
+    op.drop_table('ratings')
+    op.drop_table('comments')
+    op.drop_table('recipes')
+    op.drop_table('users')
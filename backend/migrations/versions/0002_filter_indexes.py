@@ -0,0 +1,83 @@
+"""filter and foreign-key indexes
+
+Indexes for the columns the API filters on:
+
+- recipes(author_id), comments(author_id), ratings(user_id) and
+  comment_votes(user_id): per-user lookups and the foreign key checks run
+  when a user is deleted. recipe_id and comment_id are the leading columns
+  of the unique (.., user_id) indexes (0003).
+- recipes(id) WHERE is_published: the public listing, newest first.
+- comments(recipe_id, id) WHERE is_active replaces comments(recipe_id, id):
+  deleted comments are never read by recipe, so they stay out of the index.
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY, which
+does not block writes, so this revision can be applied to a live database.
+CONCURRENTLY cannot run inside a transaction; each statement commits on its
+own. If a build is interrupted PostgreSQL leaves an INVALID index behind:
+drop it and run the upgrade again.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 19:02:40.118502
+"""
+
+from contextlib import contextmanager
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+@contextmanager
+def _outside_transaction():
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            yield
+    else:
+        yield
+
+def _create_index(name, table, columns, where=None):
+    op.create_index(
+        name, table, columns,
+        if_not_exists=True,
+        postgresql_concurrently=True,
+        postgresql_where=where,
+        sqlite_where=where,
+    )
+
+def _drop_index(name, table):
+    op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+def upgrade():
+    with _outside_transaction():
+        _create_index('ix_recipes_author_id', 'recipes', ['author_id'])
+        _create_index('ix_comments_author_id', 'comments', ['author_id'])
+        _create_index('ix_ratings_user_id', 'ratings', ['user_id'])
+        _create_index('ix_comment_votes_user_id', 'comment_votes', ['user_id'])
+        _create_index(
+            'ix_recipes_published', 'recipes', ['id'],
+            where=sa.column('is_published') == sa.true()
+        )
+        # Built before the index it replaces is dropped, so reads by recipe
+        # are never left without one
+        _create_index(
+            'ix_comments_recipe_active', 'comments', ['recipe_id', 'id'],
+            where=sa.column('is_active') == sa.true()
+        )
+        _drop_index('ix_comments_recipe_new', 'comments')
+
+def downgrade():
+    with _outside_transaction():
+        _create_index('ix_comments_recipe_new', 'comments', ['recipe_id', 'id'])
+        _drop_index('ix_comments_recipe_active', 'comments')
+        _drop_index('ix_recipes_published', 'recipes')
+        _drop_index('ix_comment_votes_user_id', 'comment_votes')
+        _drop_index('ix_ratings_user_id', 'ratings')
+        _drop_index('ix_comments_author_id', 'comments')
+        _drop_index('ix_recipes_author_id', 'recipes')
@@ -0,0 +1,216 @@
+"""rating aggregates, vote tallies, ranking scores, unique keys and search
+
+The schema the API gained on top of the initial one before migrations were
+introduced:
+
+- recipes: rating_sum, rating_count and rating_1_count .. rating_5_count,
+  backfilled from the ratings table (see app/aggregates.py).
+- comments: upvotes and downvotes, backfilled from comment_votes, and the
+  best_score and hot_score computed from them (see app/ranking.py); the
+  thread and ranking indexes.
+- One rating per user and recipe and one vote per user and comment, the
+  conflict targets of app/upserts.py. Duplicates are deleted first, keeping
+  the newest row, and the aggregates are backfilled from what remains.
+- Full-text search (see app/search.py): the generated, GIN-indexed
+  search_vector column on PostgreSQL; the recipes_fts FTS5 table on SQLite,
+  filled from recipes. Neither needs triggers: the column is generated and
+  the recipe handlers keep recipes_fts in step.
+
+Databases created with create_all() by a version of the app that already
+had some of this keep what they have: only the missing columns, indexes and
+search objects are added, and only new columns are backfilled.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:12:41.503318
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from app.ranking import wilson_lower_bound, hot_score
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+SEARCH_CONFIG = "english"
+
+PG_SEARCH_DDL = [
+    f"""
+    ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(ingredients, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(title, description, ingredients)",
+]
+
+# rating_N_count counts the ratings in star bucket N (app.aggregates.rating_bucket)
+RATING_BUCKETS = {
+    1: "rating < 2",
+    2: "rating >= 2 AND rating < 3",
+    3: "rating >= 3 AND rating < 4",
+    4: "rating >= 4 AND rating < 5",
+    5: "rating >= 5",
+}
+
+COMMENT_INDEXES = [
+    ('ix_comments_recipe_thread', ['recipe_id', 'parent_id', 'id']),
+    ('ix_comments_parent_id', ['parent_id', 'id']),
+    ('ix_comments_recipe_best', ['recipe_id', 'best_score', 'id']),
+    ('ix_comments_recipe_hot', ['recipe_id', 'hot_score', 'id']),
+]
+
+UNIQUE_KEYS = [
+    ('uq_ratings_recipe_user', 'ratings', 'recipe_id'),
+    ('uq_comment_votes_comment_user', 'comment_votes', 'comment_id'),
+]
+
+def _rating_columns():
+    return [
+        sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False),
+        sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False),
+        *[
+            sa.Column(f'rating_{i}_count', sa.Integer(), server_default='0', nullable=False)
+            for i in range(1, 6)
+        ],
+    ]
+
+def _tally_columns():
+    return [
+        sa.Column('upvotes', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('downvotes', sa.Integer(), server_default='0', nullable=False),
+    ]
+
+def _score_columns():
+    return [
+        sa.Column('best_score', sa.Float(), server_default='0', nullable=False),
+        sa.Column('hot_score', sa.Float(), server_default='0', nullable=False),
+    ]
+
+def _add_missing_columns(table, columns) -> bool:
+    """Add the ``columns`` ``table`` does not have yet; True if any were added."""
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    missing = [column for column in columns if column.name not in existing]
+    for column in missing:
+        op.add_column(table, column)
+    return bool(missing)
+
+def _remove_duplicates(table, parent_key):
+    """Keep only the newest row per (parent_key, user_id), as app.upserts.remove_duplicates."""
+    op.execute(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT max(id) FROM {table} GROUP BY {parent_key}, user_id)"
+    )
+
+def _backfill_ratings():
+    counts = ",\n".join(
+        f"rating_{bucket}_count = (SELECT count(*) FROM ratings "
+        f"WHERE ratings.recipe_id = recipes.id AND {condition})"
+        for bucket, condition in RATING_BUCKETS.items()
+    )
+    op.execute(f"""
+        UPDATE recipes SET
+        rating_sum = coalesce((SELECT sum(rating) FROM ratings WHERE ratings.recipe_id = recipes.id), 0),
+        rating_count = (SELECT count(*) FROM ratings WHERE ratings.recipe_id = recipes.id),
+        {counts}
+    """)
+
+def _backfill_tallies():
+    op.execute("""
+        UPDATE comments SET
+        upvotes = (SELECT count(*) FROM comment_votes
+                   WHERE comment_votes.comment_id = comments.id AND vote_type = 'up'),
+        downvotes = (SELECT count(*) FROM comment_votes
+                     WHERE comment_votes.comment_id = comments.id AND vote_type = 'down')
+    """)
+
+def _backfill_scores():
+    comments = sa.table(
+        'comments',
+        sa.column('id', sa.Integer()),
+        sa.column('upvotes', sa.Integer()),
+        sa.column('downvotes', sa.Integer()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+        sa.column('best_score', sa.Float()),
+        sa.column('hot_score', sa.Float()),
+    )
+    bind = op.get_bind()
+    scores = [
+        {
+            "comment_id": comment_id,
+            "best": wilson_lower_bound(upvotes, downvotes),
+            "hot": hot_score(upvotes, downvotes, created_at),
+        }
+        for comment_id, upvotes, downvotes, created_at in bind.execute(
+            sa.select(comments.c.id, comments.c.upvotes, comments.c.downvotes, comments.c.created_at)
+            .where(comments.c.created_at.is_not(None))
+        )
+    ]
+    if scores:
+        bind.execute(
+            comments.update()
+            .where(comments.c.id == sa.bindparam('comment_id'))
+            .values(best_score=sa.bindparam('best'), hot_score=sa.bindparam('hot')),
+            scores
+        )
+
+def _create_search_schema():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # The generated column fills itself
+        for statement in PG_SEARCH_DDL:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        if "recipes_fts" in sa.inspect(op.get_bind()).get_table_names():
+            return
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute(
+            "INSERT INTO recipes_fts (rowid, title, description, ingredients) "
+            "SELECT id, title, coalesce(description, ''), ingredients FROM recipes"
+        )
+
+def upgrade():
+    for name, table, parent_key in UNIQUE_KEYS:
+        _remove_duplicates(table, parent_key)
+        op.create_index(name, table, [parent_key, 'user_id'], unique=True, if_not_exists=True)
+
+    if _add_missing_columns('recipes', _rating_columns()):
+        _backfill_ratings()
+    if _add_missing_columns('comments', _tally_columns()):
+        _backfill_tallies()
+    if _add_missing_columns('comments', _score_columns()):
+        _backfill_scores()
+    for name, columns in COMMENT_INDEXES:
+        op.create_index(name, 'comments', columns, if_not_exists=True)
+
+    _create_search_schema()
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_recipes_search_vector")
+        op.execute("ALTER TABLE recipes DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS recipes_fts")
+
+    for name, _ in reversed(COMMENT_INDEXES):
+        op.drop_index(name, table_name='comments', if_exists=True)
+    with op.batch_alter_table('comments') as batch:
+        for column in reversed(_tally_columns() + _score_columns()):
+            batch.drop_column(column.name)
+    with op.batch_alter_table('recipes') as batch:
+        for column in reversed(_rating_columns()):
+            batch.drop_column(column.name)
+
+    for name, table, _ in reversed(UNIQUE_KEYS):
+        op.drop_index(name, table_name=table, if_exists=True)
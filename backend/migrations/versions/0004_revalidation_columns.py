@@ -0,0 +1,61 @@
+"""revalidation columns
+
+The columns the ETag/Last-Modified validators of app/conditional.py are
+built from:
+
+- recipes.ratings_updated_at: set on every rating change; backfilled with
+  the latest rating write, so a recipe's Last-Modified covers the ratings
+  it already has.
+- recipes.comments_version: bumped on every comment or vote change in the
+  recipe's thread; starts at 0.
+- recipes.comments_updated_at: set with comments_version; backfilled with
+  the latest comment write.
+
+Columns that exist already (a database created with create_all() by a
+version of the app that had them) are kept as they are.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:04:27.861930
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# Column -> statement backfilling it
+COLUMNS = [
+    (
+        sa.Column('ratings_updated_at', sa.DateTime(timezone=True), nullable=True),
+        "UPDATE recipes SET ratings_updated_at = (SELECT max(coalesce(updated_at, created_at)) "
+        "FROM ratings WHERE ratings.recipe_id = recipes.id)",
+    ),
+    (
+        sa.Column('comments_version', sa.Integer(), server_default='0', nullable=False),
+        None,
+    ),
+    (
+        sa.Column('comments_updated_at', sa.DateTime(timezone=True), nullable=True),
+        "UPDATE recipes SET comments_updated_at = (SELECT max(coalesce(updated_at, created_at)) "
+        "FROM comments WHERE comments.recipe_id = recipes.id)",
+    ),
+]
+
+def upgrade():
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('recipes')}
+    for column, backfill in COLUMNS:
+        if column.name in existing:
+            continue
+        op.add_column('recipes', column)
+        if backfill is not None:
+            op.execute(backfill)
+
+def downgrade():
+    with op.batch_alter_table('recipes') as batch:
+        for column, _ in reversed(COLUMNS):
+            batch.drop_column(column.name)
@@ -5,8 +5,10 @@ Run with: python quick_seed.py
 
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-from app.database import engine, get_db
+from app.database import engine, SessionLocal
 from app.models import Base, User, Recipe, Comment, Rating
+from app.aggregates import reconcile_rating_aggregates
+from app.search import rebuild_search_index
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -21,7 +23,7 @@ def create_basic_data():
     Base.metadata.create_all(bind=engine)
     
     # Get database session
-    db = next(get_db())
+    db = SessionLocal()
     
     try:
         # Check if data exists
@@ -84,6 +86,7 @@ def create_basic_data():
         for recipe in recipes:
             db.add(recipe)
         db.commit()
+        rebuild_search_index(db)
         
         print("Creating test comments...")
         # Create test comments
@@ -122,6 +125,7 @@ def create_basic_data():
         for rating in ratings:
             db.add(rating)
         db.commit()
+        reconcile_rating_aggregates(db)
         
         print("\n✅ Basic test data created successfully!")
         print("\nTest login credentials:")
@@ -5,8 +5,10 @@ Run this script to populate your database with sample users, recipes, and commen
 
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-from app.database import engine, get_db
+from app.database import engine, SessionLocal
 from app.models import Base, User, Recipe, Comment, Rating, CommentVote
+from app.aggregates import reconcile_rating_aggregates, reconcile_vote_counts
+from app.search import rebuild_search_index
 import random
 from datetime import datetime, timedelta
 
@@ -232,7 +234,7 @@ def create_sample_data():
     Base.metadata.create_all(bind=engine)
     
     # Get database session
-    db = next(get_db())
+    db = SessionLocal()
     
     try:
         # Check if data already exists
@@ -279,6 +281,7 @@ def create_sample_data():
             recipes.append(recipe)
         
         db.commit()
+        rebuild_search_index(db)
         print(f"Created {len(recipes)} recipes")
         
         print("Creating sample comments...")
@@ -329,6 +332,7 @@ def create_sample_data():
                 ratings_created += 1
         
         db.commit()
+        reconcile_rating_aggregates(db)
         print(f"Created {ratings_created} ratings")
         
         print("Creating sample comment votes...")
@@ -361,6 +365,7 @@ def create_sample_data():
                 votes_created += 1
         
         db.commit()
+        reconcile_vote_counts(db)
         print(f"Created {votes_created} comment votes")
         
         print("\n✅ Sample data created successfully!")
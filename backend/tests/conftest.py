@@ -0,0 +1,52 @@
+import os
+import tempfile
+import pytest
+
+# app.database builds its engines at import time; the API tests share one
+# SQLite file, created by the app's lifespan
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+# Every request reads the database, so the checks see its queries
+os.environ.setdefault("RESPONSE_CACHE", "false")
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """Headers of a registered, logged-in user."""
+    client.post("/api/auth/register", json={
+        "username": "cecilia", "email": "cecilia@example.com", "password": "flan-secret",
+    })
+    response = client.post(
+        "/api/auth/login", data={"username": "cecilia", "password": "flan-secret"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def recipe_id(client, auth_headers):
+    """A recipe with a rating and a voted-on comment thread, written through the API."""
+    for title in ("Caramel flan", "Tres leches cake", "Churros"):
+        response = client.post("/api/recipes/", headers=auth_headers, json={
+            "title": title, "description": "A classic", "ingredients": "eggs, milk, sugar",
+            "instructions": "Mix and bake",
+        })
+        assert response.status_code == 200
+    recipe_id = response.json()["id"]
+    client.post("/api/ratings/", headers=auth_headers, json={"recipe_id": recipe_id, "rating": 4.5})
+    parent = client.post("/api/comments/", headers=auth_headers, json={
+        "recipe_id": recipe_id, "content": "Lovely",
+    }).json()
+    for content in ("Agreed", "Too sweet"):
+        client.post("/api/comments/", headers=auth_headers, json={
+            "recipe_id": recipe_id, "content": content, "parent_id": parent["id"],
+        })
+    client.post(f"/api/comments/{parent['id']}/vote", headers=auth_headers, json={"vote_type": "up"})
+    return recipe_id
@@ -0,0 +1,31 @@
+"""
+Every relationship a read endpoint's response model reads is loaded by the
+router's query options, never lazily (see app.testing.assert_no_lazy_loads).
+
+    python -m pytest tests/test_loading.py
+"""
+
+import pytest
+from app.testing import assert_no_lazy_loads
+
+@pytest.mark.parametrize("path", [
+    "/api/recipes/",
+    "/api/recipes/?fields=full",
+    "/api/recipes/?normalized=true",
+    "/api/recipes/?search=flan",
+    "/api/recipes/{recipe_id}",
+    "/api/comments/recipe/{recipe_id}",
+    "/api/comments/recipe/{recipe_id}?normalized=true",
+    "/api/comments/recipe/{recipe_id}/thread",
+    "/api/comments/recipe/{recipe_id}/thread?normalized=true",
+])
+def test_read_endpoints_do_not_lazy_load(client, recipe_id, path):
+    with assert_no_lazy_loads():
+        response = client.get(path.format(recipe_id=recipe_id))
+    assert response.status_code == 200
+
+def test_current_user_does_not_lazy_load(client, auth_headers):
+    with assert_no_lazy_loads():
+        response = client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "cecilia"
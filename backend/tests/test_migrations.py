@@ -0,0 +1,96 @@
+"""
+Upgrading a database that has the initial schema (revision 0001, as
+create_all() built it before migrations existed) to the latest revision.
+
+    python -m pytest tests/test_migrations.py
+"""
+
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from app.models import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def _config(url: str) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+def test_upgrade_backfills_and_dedupes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    config = _config(url)
+    command.upgrade(config, "0001")
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password) "
+            "VALUES (1, 'ana', 'ana@example.com', 'x'), (2, 'luis', 'luis@example.com', 'x')"
+        ))
+        connection.execute(text(
+            "INSERT INTO recipes (id, title, ingredients, instructions, author_id) "
+            "VALUES (1, 'Flan', 'eggs', 'bake', 1)"
+        ))
+        connection.execute(text(
+            "INSERT INTO comments (id, content, recipe_id, author_id) VALUES (1, 'Nice', 1, 2)"
+        ))
+        # User 1 rated and voted twice; only the newest row is kept
+        connection.execute(text(
+            "INSERT INTO ratings (id, rating, recipe_id, user_id) "
+            "VALUES (1, 2.0, 1, 1), (2, 4.5, 1, 1), (3, 5.0, 1, 2)"
+        ))
+        connection.execute(text(
+            "INSERT INTO comment_votes (id, vote_type, comment_id, user_id) "
+            "VALUES (1, 'down', 1, 1), (2, 'up', 1, 1), (3, 'up', 1, 2)"
+        ))
+
+    try:
+        command.upgrade(config, "head")
+        with engine.connect() as connection:
+            recipe = connection.execute(text(
+                "SELECT rating_sum, rating_count, rating_2_count, rating_4_count, rating_5_count "
+                "FROM recipes WHERE id = 1"
+            )).one()
+            comment = connection.execute(text(
+                "SELECT upvotes, downvotes, best_score, hot_score FROM comments WHERE id = 1"
+            )).one()
+            ratings = connection.execute(text("SELECT id FROM ratings ORDER BY id")).scalars().all()
+            indexed = connection.execute(text("SELECT rowid FROM recipes_fts")).scalars().all()
+            revalidation = connection.execute(text(
+                "SELECT ratings_updated_at IS NOT NULL, comments_version, comments_updated_at IS NOT NULL "
+                "FROM recipes WHERE id = 1"
+            )).one()
+        assert ratings == [2, 3]
+        assert tuple(recipe) == (9.5, 2, 0, 1, 1)
+        assert (comment.upvotes, comment.downvotes) == (2, 0)
+        assert comment.best_score > 0 and comment.hot_score != 0
+        assert indexed == [1]
+        assert tuple(revalidation) == (1, 0, 1)
+    finally:
+        engine.dispose()
+
+def _schema(engine) -> dict:
+    schema = {}
+    inspector = inspect(engine)
+    for table in inspector.get_table_names():
+        if table == "alembic_version" or table.startswith("recipes_fts"):
+            continue
+        schema[table] = (
+            {(column["name"], str(column["type"]), column["nullable"]) for column in inspector.get_columns(table)},
+            {(index["name"], tuple(index["column_names"]), bool(index["unique"]))
+             for index in inspector.get_indexes(table)},
+        )
+    return schema
+
+def test_migrations_match_the_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    created = create_engine(f"sqlite:///{tmp_path / 'created.db'}")
+    try:
+        command.upgrade(_config(str(migrated.url)), "head")
+        Base.metadata.create_all(created)
+        assert _schema(migrated) == _schema(created)
+    finally:
+        migrated.dispose()
+        created.dispose()
@@ -0,0 +1,44 @@
+"""
+app.testing.strict_queries: a statement repeated within one request (an
+N+1 query) fails it, and the hot read endpoints run each statement once.
+
+    python -m pytest tests/test_queries.py
+"""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.instrumentation import QueryStatsMiddleware, RepeatedQueryError
+from app.models import Recipe, Rating
+from app.testing import strict_queries
+
+def test_n_plus_one_raises(recipe_id):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/ratings-per-recipe")
+    async def ratings_per_recipe(db: AsyncSession = Depends(get_db)):
+        # One query per recipe instead of one for all of them
+        counts = {}
+        for id in (await db.scalars(select(Recipe.id))).all():
+            counts[id] = len((await db.scalars(select(Rating.id).where(Rating.recipe_id == id))).all())
+        return counts
+
+    with TestClient(app) as client, strict_queries(max_repeats=1):
+        with pytest.raises(RepeatedQueryError, match="ratings"):
+            client.get("/ratings-per-recipe")
+
+@pytest.mark.parametrize("path", [
+    "/api/recipes/",
+    "/api/recipes/?search=flan",
+    "/api/recipes/{recipe_id}",
+    "/api/comments/recipe/{recipe_id}",
+    "/api/comments/recipe/{recipe_id}/thread",
+])
+def test_hot_endpoints_run_each_statement_once(client, recipe_id, path):
+    with strict_queries(max_repeats=1):
+        response = client.get(path.format(recipe_id=recipe_id))
+    assert response.status_code == 200
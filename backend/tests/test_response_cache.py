@@ -0,0 +1,46 @@
+"""
+The shared response cache tier across workers: two ResponseCache instances
+on one MemoryBackend stand in for two processes sharing a Redis.
+
+    python -m pytest tests/test_response_cache.py
+"""
+
+import asyncio
+from app.cache import TTLCache
+from app.response_cache import MemoryBackend, ResponseCache
+
+def _workers(count: int = 2):
+    shared = MemoryBackend()
+    return [ResponseCache(True, TTLCache(max_entries=10, ttl=60), shared) for _ in range(count)]
+
+def test_fill_is_shared_with_other_workers():
+    async def run():
+        filler, reader = _workers()
+        token = await filler.fill_token()
+        await filler.set("recipe:1", b'{"title": "Flan"}', tags=["recipe:1"], token=token)
+        entry = await reader.get("recipe:1")
+        assert entry is not None and entry.body == b'{"title": "Flan"}'
+
+        await filler.invalidate("recipe:1")
+        # The reader's first tier keeps its copy for up to its TTL
+        reader.clear()
+        assert await reader.get("recipe:1") is None
+
+    asyncio.run(run())
+
+def test_fill_racing_an_invalidation_is_not_shared():
+    async def run():
+        filler, writer = _workers()
+        token = await filler.fill_token()
+        # Another worker commits a change and invalidates after the filler
+        # read the database but before it stores what it read
+        await writer.invalidate("recipe:1")
+        await filler.set("recipe:1", b'{"title": "Old"}', tags=["recipe:1"], token=token)
+        assert await writer.get("recipe:1") is None
+
+        token = await filler.fill_token()
+        await filler.set("recipe:1", b'{"title": "New"}', tags=["recipe:1"], token=token)
+        entry = await writer.get("recipe:1")
+        assert entry is not None and entry.body == b'{"title": "New"}'
+
+    asyncio.run(run())
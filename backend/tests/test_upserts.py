@@ -0,0 +1,93 @@
+"""
+Concurrent rating and vote writes against a SQLite file: each writer runs
+in its own session and connection, as requests do, and the aggregates must
+end up matching the rows.
+
+    python -m pytest tests/test_upserts.py
+"""
+
+import asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.database import Base
+from app.models import User, Recipe, Comment, Rating, CommentVote
+from app.aggregates import apply_rating_change, apply_vote_change
+from app import upserts
+
+WRITERS = 8
+
+async def _setup(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with Session() as db:
+        users = [
+            User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+            for i in range(2)
+        ]
+        db.add_all(users)
+        await db.flush()
+        recipe = Recipe(title="Flan", ingredients="eggs", instructions="bake", author_id=users[0].id)
+        db.add(recipe)
+        await db.flush()
+        comment = Comment(content="Nice", recipe_id=recipe.id, author_id=users[0].id)
+        db.add(comment)
+        await db.commit()
+        return engine, Session, [user.id for user in users], recipe.id, comment.id
+
+async def _rate(Session, recipe_id, user_id, value):
+    async with Session() as db:
+        _, previous = await upserts.upsert_rating(db, recipe_id, user_id, value)
+        await apply_rating_change(db, recipe_id, old_value=previous, new_value=value)
+        await db.commit()
+
+async def _vote(Session, comment_id, user_id, vote_type):
+    async with Session() as db:
+        _, previous = await upserts.upsert_vote(db, comment_id, user_id, vote_type)
+        await apply_vote_change(db, comment_id, old_type=previous, new_type=vote_type)
+        await db.commit()
+
+def test_concurrent_ratings_keep_aggregates(tmp_path):
+    async def run():
+        engine, Session, user_ids, recipe_id, _ = await _setup(tmp_path / "ratings.db")
+        try:
+            await asyncio.gather(*(
+                _rate(Session, recipe_id, user_ids[i % 2], float(i % 5 + 1)) for i in range(WRITERS)
+            ))
+            async with Session() as db:
+                recipe = await db.get(Recipe, recipe_id)
+                count, total = (await db.execute(
+                    select(func.count(), func.sum(Rating.rating)).where(Rating.recipe_id == recipe_id)
+                )).one()
+            assert count == len(user_ids)
+            assert recipe.rating_count == count
+            assert recipe.rating_sum == total
+            # Ratings are not edits to the recipe
+            assert recipe.updated_at is None
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+def test_concurrent_votes_keep_counts(tmp_path):
+    async def run():
+        engine, Session, user_ids, _, comment_id = await _setup(tmp_path / "votes.db")
+        try:
+            await asyncio.gather(*(
+                _vote(Session, comment_id, user_ids[i % 2], ("up", "down")[i // 2 % 2]) for i in range(WRITERS)
+            ))
+            async with Session() as db:
+                comment = await db.get(Comment, comment_id)
+                votes = dict((await db.execute(
+                    select(CommentVote.vote_type, func.count())
+                    .where(CommentVote.comment_id == comment_id).group_by(CommentVote.vote_type)
+                )).all())
+            assert sum(votes.values()) == len(user_ids)
+            assert comment.upvotes == votes.get("up", 0)
+            assert comment.downvotes == votes.get("down", 0)
+            assert comment.updated_at is None
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())